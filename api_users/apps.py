@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class ApiUsersConfig(AppConfig):
     name = 'api_users'
+
+    def ready(self):
+        from . import db, signals  # noqa: F401
+
+        # Load the common password list once at startup
+        from django.contrib.auth.password_validation import (
+            get_default_password_validators
+        )
+        get_default_password_validators()
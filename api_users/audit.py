@@ -0,0 +1,249 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .models import AuditEvent
+from .renderers import dumps
+
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseSink:
+    """
+    Appends events to the AuditEvent table, one INSERT per batch
+    """
+
+    def write(self, events):
+        AuditEvent.objects.bulk_create(
+            [AuditEvent(**event) for event in events]
+        )
+
+
+class NDJSONSink:
+    """
+    Appends events as JSON lines to 'path', which is rotated to
+    'path.1' ... 'path.<backup_count>' once it would exceed 'max_bytes'
+    """
+
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backup_count=5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+
+    def write(self, events):
+        data = b''.join(dumps(event) + b'\n' for event in events)
+        with self._lock:
+            try:
+                size = os.path.getsize(self.path)
+            except OSError:
+                size = 0
+            if size and size + len(data) > self.max_bytes:
+                self.rotate()
+            with open(self.path, 'ab') as stream:
+                stream.write(data)
+
+    def rotate(self):
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f'{self.path}.{index}'
+            if os.path.exists(source):
+                os.replace(source, f'{self.path}.{index + 1}')
+        if self.backup_count:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+
+
+class AuditLog:
+    """
+    Bounded in-memory queue of audit events drained in batches of up to
+    'batch_size', at least every 'interval' seconds, by a background
+    thread, so requests never wait for the write. With 'max_size'
+    events queued, 'drop' discards new events and 'block' waits up to
+    'block_timeout' seconds for room first. Without 'worker' due
+    batches are written by the thread that records the event.
+    close() writes everything still queued
+    """
+
+    def __init__(self, sink, batch_size=100, interval=1.0, max_size=10000,
+                 policy='drop', block_timeout=0.05, worker=True):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.interval = interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.worker = worker
+        self.queue = queue.Queue(maxsize=max_size)
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._flushed = time.monotonic()
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def record(self, event):
+        """
+        Queue 'event', False when it was dropped
+        """
+        try:
+            if self.policy == 'block':
+                self.queue.put(event, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(event)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        if self.worker:
+            self._start()
+        elif (self.queue.qsize() >= self.batch_size
+              or time.monotonic() - self._flushed >= self.interval):
+            self.flush()
+        return True
+
+    def _start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name='audit', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                batch = self._collect()
+                if batch:
+                    self._write(batch)
+        finally:
+            connections.close_all()
+
+    def _collect(self):
+        batch = []
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size and not self._stop.is_set():
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=min(timeout, 0.1)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def _write(self, batch):
+        with self._write_lock:
+            try:
+                self.sink.write(batch)
+            except Exception:
+                logger.exception('Lost %d audit events', len(batch))
+                with self._lock:
+                    self.failed += len(batch)
+            else:
+                with self._lock:
+                    self.written += len(batch)
+
+    def flush(self):
+        """
+        Write every queued event from the calling thread
+        """
+        self._flushed = time.monotonic()
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            self._write(batch)
+
+    def close(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': self.queue.qsize(),
+                'written': self.written,
+                'dropped': self.dropped,
+                'failed': self.failed,
+            }
+
+
+_logs = {}
+_logs_lock = threading.Lock()
+
+
+def audit_log():
+    """
+    AuditLog configured by settings.AUDIT_LOG, None when disabled
+    """
+    options = getattr(settings, 'AUDIT_LOG', {})
+    if not options.get('ENABLED', False):
+        return None
+    key = tuple(sorted(options.items()))
+    with _logs_lock:
+        if key not in _logs:
+            if options.get('BACKEND', 'database') == 'ndjson':
+                sink = NDJSONSink(
+                    options['PATH'],
+                    max_bytes=options.get('MAX_BYTES', 10 * 1024 * 1024),
+                    backup_count=options.get('BACKUP_COUNT', 5),
+                )
+            else:
+                sink = DatabaseSink()
+            log = AuditLog(
+                sink,
+                batch_size=options.get('BATCH_SIZE', 100),
+                interval=options.get('INTERVAL', 1.0),
+                max_size=options.get('MAX_SIZE', 10000),
+                policy=options.get('POLICY', 'drop'),
+                block_timeout=options.get('BLOCK_TIMEOUT', 0.05),
+                worker=options.get('WORKER', True),
+            )
+            atexit.register(log.close)
+            _logs[key] = log
+        return _logs[key]
+
+
+def record(action, request, user_ids, fields=None, actor_id=None):
+    """
+    Queue one 'action' event per id in 'user_ids', made by 'actor_id'
+    or the authenticated user of 'request'
+    """
+    log = audit_log()
+    if log is None:
+        return
+    if actor_id is None and request.user.is_authenticated:
+        actor_id = request.user.pk
+    now = timezone.now()
+    fields = ','.join(fields or ())
+    remote_addr = request.META.get('REMOTE_ADDR') or None
+    for user_id in user_ids:
+        log.record({
+            'created': now,
+            'action': action,
+            'user_id': user_id,
+            'actor_id': actor_id,
+            'fields': fields,
+            'remote_addr': remote_addr,
+        })
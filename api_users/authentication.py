@@ -0,0 +1,297 @@
+import atexit
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DatabaseError, connections, router
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .cache import LRUCache
+from .models import TokenActivity
+
+
+User = get_user_model()
+
+
+class TokenCache:
+    """
+    Two-tier cache of resolved tokens: a bounded local LRU/TTL cache
+    in front of an optional shared Django cache backend
+    (settings.TOKEN_CACHE['BACKEND'] is a CACHES alias).
+    Only the user fields authentication and the views read are cached
+    (no password hash), every hit builds fresh model instances so
+    requests never share mutable objects; other fields load on access.
+    With a shared backend every hit is checked against a per-user
+    version there, so invalidations reach all processes at once;
+    without one other processes see them after up to 'ttl' seconds
+    """
+
+    prefix = 'api_users:token:v2:'
+    cached_fields = ('username', 'first_name', 'last_name', 'email',
+                     'is_active', 'is_staff', 'is_superuser', 'last_login')
+
+    def __init__(self, max_size=10000, ttl=300, backend=None):
+        self.local = LRUCache(max_size=max_size, ttl=ttl,
+                              on_remove=self._forget)
+        self.ttl = ttl
+        self.backend = backend
+        self.shared_hits = 0
+        self._user_keys = {}
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        if self.backend is None:
+            return None
+        return caches[self.backend]
+
+    def get(self, key):
+        entry = self.local.get(key)
+        if entry is not None and not self._current(entry):
+            self.local.delete(key)
+            entry = None
+        if entry is None and self.shared is not None:
+            entry = self.shared.get(self.prefix + key)
+            if entry is not None and self._current(entry):
+                self.shared_hits += 1
+                self._set_local(key, entry)
+            else:
+                entry = None
+        if entry is None:
+            return None
+        return self._restore(key, entry)
+
+    def _version_key(self, user_pk):
+        return f'{self.prefix}user:{user_pk}'
+
+    def _version(self, user_pk):
+        if self.shared is None:
+            return 0
+        return self.shared.get(self._version_key(user_pk), 0)
+
+    def _current(self, entry):
+        return entry[3] == self._version(self._user_pk(entry))
+
+    def set(self, token):
+        entry = self._snapshot(token)
+        self._set_local(token.key, entry)
+        if self.shared is not None:
+            self.shared.set(self.prefix + token.key, entry, self.ttl)
+
+    def _user_pk(self, entry):
+        return entry[2][self._user_fields().index(User._meta.pk.attname)]
+
+    def _set_local(self, key, entry):
+        with self._lock:
+            self._user_keys.setdefault(self._user_pk(entry), set()).add(key)
+        self.local.set(key, entry)
+
+    def _forget(self, key, entry):
+        """
+        Drop 'key' from the user index once the local tier lets it go
+        """
+        user_pk = self._user_pk(entry)
+        with self._lock:
+            keys = self._user_keys.get(user_pk)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._user_keys[user_pk]
+
+    @classmethod
+    def _user_fields(cls):
+        return [
+            field.attname for field in User._meta.concrete_fields
+            if field.primary_key or field.attname in cls.cached_fields
+        ]
+
+    def _snapshot(self, token):
+        user = token.user
+        return (
+            token._state.db,
+            token.created,
+            tuple(getattr(user, name) for name in self._user_fields()),
+            self._version(user.pk),
+        )
+
+    def _restore(self, key, entry):
+        db, created, values, version = entry
+        user = User.from_db(db, self._user_fields(), values)
+        token = Token.from_db(
+            db, ['key', 'user_id', 'created'], [key, user.pk, created]
+        )
+        token.user = user
+        return token
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(self.prefix + key)
+
+    def delete_user(self, user_pk):
+        with self._lock:
+            keys = self._user_keys.pop(user_pk, set())
+        if self.shared is not None:
+            # Local entries of other processes stop matching
+            version_key = self._version_key(user_pk)
+            try:
+                self.shared.incr(version_key)
+            except ValueError:
+                self.shared.add(version_key, 1, None)
+            keys.update(Token.objects.filter(
+                user_id=user_pk).values_list('key', flat=True))
+        for key in keys:
+            self.delete(key)
+
+    def clear(self):
+        self.local.clear()
+        with self._lock:
+            self._user_keys.clear()
+
+    def stats(self):
+        stats = self.local.stats()
+        stats['shared_hits'] = self.shared_hits
+        return stats
+
+
+def _build_token_cache():
+    options = getattr(settings, 'TOKEN_CACHE', {})
+    return TokenCache(
+        max_size=options.get('MAX_SIZE', 10000),
+        ttl=options.get('TTL', 300),
+        backend=options.get('BACKEND'),
+    )
+
+
+token_cache = _build_token_cache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that resolves keys through 'token_cache'.
+    Entries are invalidated by signals on Token and User changes
+    (see 'api_users.signals')
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(token)
+        elif not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return (token.user, token)
+
+
+def token_expired(token, now=None):
+    """
+    True once the token is older than settings.TOKEN_EXPIRY['MAX_AGE']
+    seconds (None means tokens never expire)
+    """
+    max_age = getattr(settings, 'TOKEN_EXPIRY', {}).get('MAX_AGE')
+    if max_age is None:
+        return False
+    now = now or timezone.now()
+    return token.created <= now - timedelta(seconds=max_age)
+
+
+class TokenUsageBuffer:
+    """
+    Collects keys of tokens used since the last flush and writes their
+    TokenActivity.last_used in one batch at most every 'interval'
+    seconds, instead of one write per request
+    """
+
+    chunk_size = 500
+
+    def __init__(self, interval=60, max_keys=10000):
+        self.interval = interval
+        self.max_keys = max_keys
+        self._keys = set()
+        self._database = None
+        self._flushed = time.monotonic()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _database_name():
+        alias = router.db_for_write(TokenActivity)
+        return connections[alias].settings_dict['NAME']
+
+    def touch(self, key):
+        with self._lock:
+            if not self._keys:
+                self._database = self._database_name()
+            self._keys.add(key)
+            due = (len(self._keys) >= self.max_keys
+                   or time.monotonic() - self._flushed >= self.interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            keys, self._keys = list(self._keys), set()
+            self._flushed = time.monotonic()
+        now = timezone.now()
+        for start in range(0, len(keys), self.chunk_size):
+            chunk = keys[start:start + self.chunk_size]
+            existing = list(Token.objects.filter(
+                key__in=chunk).values_list('key', flat=True))
+            TokenActivity.objects.bulk_create(
+                [TokenActivity(token_id=key, last_used=now)
+                 for key in existing],
+                ignore_conflicts=True,
+            )
+            TokenActivity.objects.filter(
+                token_id__in=existing).update(last_used=now)
+
+    def flush_at_exit(self):
+        """
+        Skipped when nothing is pending or the keys were collected
+        against another database, such as a test database destroyed
+        before the interpreter exits
+        """
+        with self._lock:
+            pending, database = bool(self._keys), self._database
+        if not pending or database != self._database_name():
+            return
+        try:
+            self.flush()
+        except DatabaseError:
+            pass
+
+
+def _build_token_usage():
+    options = getattr(settings, 'TOKEN_EXPIRY', {})
+    buffer = TokenUsageBuffer(
+        interval=options.get('USAGE_FLUSH_INTERVAL', 60),
+        max_keys=options.get('USAGE_MAX_KEYS', 10000),
+    )
+    atexit.register(buffer.flush_at_exit)
+    return buffer
+
+
+token_usage = _build_token_usage()
+
+
+class ExpiringTokenAuthentication(CachedTokenAuthentication):
+    """
+    CachedTokenAuthentication that rejects expired tokens and records
+    token usage through 'token_usage'
+    """
+
+    def authenticate_credentials(self, key):
+        user, token = super().authenticate_credentials(key)
+        if token_expired(token):
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        token_usage.touch(key)
+        return (user, token)
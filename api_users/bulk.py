@@ -0,0 +1,165 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+
+from rest_framework.exceptions import ValidationError
+
+from .signals import users_changed
+
+
+User = get_user_model()
+
+
+class BulkUserOperation:
+    """
+    Validates a batch of create/update/delete items with the write
+    serializer and applies all of them in one transaction with
+    bulk_create/bulk_update. Nothing is written if any item is invalid.
+
+    Payload: {"create": [{...}], "update": [{"id": 1, ...}], "delete": [2]}
+    """
+
+    def __init__(self, data, serializer_class, context=None, max_items=1000):
+        self.data = data
+        self.serializer_class = serializer_class
+        self.context = context or {}
+        self.max_items = max_items
+        self.errors = {}
+        self._create = []
+        self._update = []
+        self._delete = []
+        # (operation, item index, username) of every valid item setting one
+        self._usernames = []
+
+    def _items(self, name):
+        items = self.data.get(name, [])
+        if not isinstance(items, list):
+            self.errors[name] = ['Expected a list of items.']
+            return []
+        return items
+
+    def is_valid(self):
+        if not isinstance(self.data, dict):
+            self.errors['non_field_errors'] = [
+                'Expected an object with create, update and delete lists.'
+            ]
+            return False
+        create = self._items('create')
+        update = self._items('update')
+        delete = self._items('delete')
+        if len(create) + len(update) + len(delete) > self.max_items:
+            self.errors['non_field_errors'] = [
+                f'Ensure there are no more than {self.max_items} items.'
+            ]
+        if self.errors:
+            return False
+
+        self._validate_create(create)
+        self._validate_update(update)
+        self._validate_delete(delete)
+        self._validate_usernames()
+        return not self.errors
+
+    def _validate_create(self, items):
+        errors = {}
+        for index, item in enumerate(items):
+            serializer = self.serializer_class(
+                data=item, context=self.context
+            )
+            if serializer.is_valid():
+                self._create.append(serializer.validated_data)
+                self._usernames.append(
+                    ('create', index, serializer.validated_data['username'])
+                )
+            else:
+                errors[index] = serializer.errors
+        if errors:
+            self.errors['create'] = errors
+
+    def _validate_update(self, items):
+        errors = {}
+        ids = [item.get('id') for item in items if isinstance(item, dict)]
+        instances = User.objects.in_bulk(
+            [pk for pk in ids if isinstance(pk, int)]
+        )
+        counts = Counter(ids)
+        for index, item in enumerate(items):
+            pk = item.get('id') if isinstance(item, dict) else None
+            instance = instances.get(pk)
+            if instance is None:
+                errors[index] = {'id': ['User not found.']}
+                continue
+            if counts[pk] > 1:
+                errors[index] = {'id': ['Duplicate id in this batch.']}
+                continue
+            serializer = self.serializer_class(
+                instance, data=item, partial=True, context=self.context
+            )
+            if serializer.is_valid():
+                self._update.append((instance, serializer.validated_data))
+                if 'username' in serializer.validated_data:
+                    self._usernames.append((
+                        'update', index,
+                        serializer.validated_data['username'],
+                    ))
+            else:
+                errors[index] = serializer.errors
+        if errors:
+            self.errors['update'] = errors
+
+    def _validate_delete(self, items):
+        errors = {}
+        for index, pk in enumerate(items):
+            if isinstance(pk, int):
+                self._delete.append(pk)
+            else:
+                errors[index] = ['Expected a user id.']
+        if errors:
+            self.errors['delete'] = errors
+
+    def _validate_usernames(self):
+        """
+        Each item was checked against the database alone, usernames set
+        by several creates or updates of the batch would collide
+        """
+        counts = Counter(username for _, _, username in self._usernames)
+        for name, index, username in self._usernames:
+            if counts[username] > 1:
+                self.errors.setdefault(name, {})[index] = {
+                    'username': ['Duplicate username in this batch.']
+                }
+
+    def save(self):
+        assert not self.errors, 'Cannot call save() on invalid items.'
+        fields = set()
+        for instance, validated_data in self._update:
+            for name, value in validated_data.items():
+                setattr(instance, name, value)
+            fields.update(validated_data)
+        updated = [instance for instance, _ in self._update]
+
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create([
+                    User(**validated_data) for validated_data in self._create
+                ])
+                if updated and fields:
+                    User.objects.bulk_update(updated, sorted(fields))
+                to_delete = User.objects.filter(pk__in=self._delete)
+                deleted = sorted(to_delete.values_list('pk', flat=True))
+                to_delete.delete()
+        except IntegrityError:
+            # A concurrent write took a username validated above
+            raise ValidationError({'non_field_errors': [
+                'The batch conflicts with concurrent changes, retry it.'
+            ]})
+
+        created = list(User.objects.filter(username__in=[
+            validated_data['username'] for validated_data in self._create
+        ]).order_by('id'))
+        changed = [user.pk for user in created + updated]
+        if changed:
+            users_changed.send(sender=User, pks=changed,
+                               fields=sorted(fields))
+        return {'created': created, 'updated': updated, 'deleted': deleted}
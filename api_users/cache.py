@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe in-process cache bounded both by size (least recently
+    used entries are evicted first) and by age of entries.
+    'on_remove(key, value)' is called, outside the lock, for every entry
+    that is evicted, expires, is deleted or cleared
+    """
+
+    def __init__(self, max_size=1024, ttl=300, on_remove=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_remove = on_remove
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _removed(self, items):
+        if self.on_remove is not None:
+            for key, (expires, value) in items:
+                self.on_remove(key, value)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires, value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires >= time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+            self.misses += 1
+        self._removed([(key, (expires, value))])
+        return default
+
+    def set(self, key, value):
+        evicted = []
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                evicted.append(self._data.popitem(last=False))
+                self.evictions += 1
+        self._removed(evicted)
+
+    def delete(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+        if item is not None:
+            self._removed([(key, item)])
+
+    def clear(self):
+        with self._lock:
+            items = list(self._data.items())
+            self._data.clear()
+        self._removed(items)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            'size': len(self._data),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
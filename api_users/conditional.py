@@ -0,0 +1,62 @@
+import hashlib
+
+from .models import ChangeCounter
+
+
+def users_state(request):
+    """
+    (version, modified) of the users table, read once per request
+    """
+    state = getattr(request, '_users_state', None)
+    if state is None:
+        state = ChangeCounter.objects.state(ChangeCounter.USERS)
+        request._users_state = state
+    return state
+
+
+def users_etag(request, *args, **kwargs):
+    """
+    Strong ETag of a users representation: the table version and its
+    timestamp (so a reset counter never repeats a tag) plus everything
+    else the body depends on (scheme, host, path and query, which end up
+    in pagination and browsable API links, and Accept).
+    None while the counter has never been bumped
+    """
+    version, modified = users_state(request)
+    if modified is None:
+        return None
+    key = '{}|{}|{}|{}'.format(
+        version, modified, request.build_absolute_uri(),
+        request.META.get('HTTP_ACCEPT', '')
+    )
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def user_etag(request, *args, pk=None, **kwargs):
+    """
+    Strong ETag of one user's representation: the user's sequence number
+    in the change feed, which moves on writes to that user only, plus the
+    request details users_etag covers. Read together with the table state
+    in one query. Falls back to users_etag for users the feed has never
+    seen
+    """
+    # Out of range ids cannot be in the feed (and overflow SQLite)
+    if (pk is None or not str(pk).isdecimal()
+            or int(pk) > 2 ** 63 - 1):
+        return users_etag(request)
+    state = getattr(request, '_user_state', None)
+    if state is None:
+        state = ChangeCounter.objects.user_state(ChangeCounter.USERS, pk)
+        request._user_state = state
+        request._users_state = state[:2]
+    if state[2] is None:
+        return users_etag(request)
+    key = 'user|{}|{}|{}'.format(
+        state[2], request.build_absolute_uri(),
+        request.META.get('HTTP_ACCEPT', '')
+    )
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def users_last_modified(request, *args, **kwargs):
+    return users_state(request)[1]
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    Run settings.SQLITE_PRAGMAS on every new SQLite connection
+    (WAL journal, synchronous level, cache size...)
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(request_started)
+def check_persistent_connections(sender, **kwargs):
+    """
+    With settings.DB_HEALTH_CHECKS, drop persistent connections that no
+    longer answer before a request uses them, the next query reconnects
+    """
+    if not getattr(settings, 'DB_HEALTH_CHECKS', False):
+        return
+    for connection in connections.all():
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
@@ -0,0 +1,15 @@
+from .renderers import dumps
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield dumps(row) + b'\n'
+
+
+def iter_json(rows):
+    yield b'['
+    separator = b''
+    for row in rows:
+        yield separator + dumps(row)
+        separator = b','
+    yield b']'
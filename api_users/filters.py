@@ -0,0 +1,88 @@
+from django.utils.dateparse import parse_datetime
+
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+
+class UserFilterBackend(BaseFilterBackend):
+    """
+    Index-backed filters of the users list:
+
+    ?username=jerry               exact match
+    ?username_prefix=je           prefix search
+    ?is_active=true               active flag
+    ?last_login_after=<ISO 8601>  last_login range, inclusive
+    ?last_login_before=<ISO 8601>
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        username = params.get('username')
+        if username is not None:
+            queryset = queryset.filter(username=username)
+
+        prefix = params.get('username_prefix')
+        if prefix:
+            # A range lets the username index serve the search,
+            # startswith keeps the result exact for any collation
+            queryset = queryset.filter(
+                username__gte=prefix, username__startswith=prefix
+            )
+            upper = self.prefix_upper_bound(prefix)
+            if upper is not None:
+                queryset = queryset.filter(username__lt=upper)
+
+        is_active = params.get('is_active')
+        if is_active is not None:
+            queryset = queryset.filter(
+                is_active=self.parse_bool('is_active', is_active)
+            )
+
+        after = params.get('last_login_after')
+        if after is not None:
+            queryset = queryset.filter(
+                last_login__gte=self.parse_datetime('last_login_after', after)
+            )
+        before = params.get('last_login_before')
+        if before is not None:
+            queryset = queryset.filter(
+                last_login__lte=self.parse_datetime(
+                    'last_login_before', before
+                )
+            )
+        return queryset
+
+    @staticmethod
+    def prefix_upper_bound(prefix):
+        """
+        Smallest string above every string starting with 'prefix', None
+        when it consists of the last code point only. Surrogates, which
+        cannot be encoded, are skipped
+        """
+        stripped = prefix.rstrip(chr(0x10FFFF))
+        if not stripped:
+            return None
+        code = ord(stripped[-1]) + 1
+        if 0xD800 <= code <= 0xDFFF:
+            code = 0xE000
+        return stripped[:-1] + chr(code)
+
+    @staticmethod
+    def parse_bool(name, value):
+        field = serializers.BooleanField()
+        try:
+            return field.to_internal_value(value)
+        except serializers.ValidationError as exc:
+            raise serializers.ValidationError({name: exc.detail})
+
+    @staticmethod
+    def parse_datetime(name, value):
+        try:
+            parsed = parse_datetime(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise serializers.ValidationError(
+                {name: ['Expected an ISO 8601 datetime.']}
+            )
+        return parsed
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+def _cost(name, default):
+    return getattr(settings, 'PASSWORD_HASHER_COST', {}).get(name, default)
+
+
+class TunablePBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    PBKDF2 with the iteration count taken from
+    settings.PASSWORD_HASHER_COST['PBKDF2_ITERATIONS']. Hashes made with
+    a different count are upgraded on the next successful login
+    """
+
+    @property
+    def iterations(self):
+        return _cost('PBKDF2_ITERATIONS',
+                     hashers.PBKDF2PasswordHasher.iterations)
+
+
+class TunableArgon2PasswordHasher(hashers.Argon2PasswordHasher):
+
+    @property
+    def time_cost(self):
+        return _cost('ARGON2_TIME_COST',
+                     hashers.Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return _cost('ARGON2_MEMORY_COST',
+                     hashers.Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return _cost('ARGON2_PARALLELISM',
+                     hashers.Argon2PasswordHasher.parallelism)
+
+
+class TunableBCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+
+    @property
+    def rounds(self):
+        return _cost('BCRYPT_ROUNDS',
+                     hashers.BCryptSHA256PasswordHasher.rounds)
@@ -0,0 +1,218 @@
+import json
+import os
+import queue
+import random
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api_users.audit import audit_log
+
+
+User = get_user_model()
+
+SCENARIOS = ('login', 'list', 'retrieve', 'patch', 'delete')
+PASSWORD = 'asfaQQWd12'
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = ('Seed a throwaway SQLite database and measure latency '
+            'percentiles, throughput and queries per request of the '
+            'users API and login')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=200,
+                            help='requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--page-size', type=int, default=100,
+                            help='page size of list requests, 0 for no '
+                                 'pagination')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        scenarios = options['scenarios'].split(',')
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            self.stderr.write(f'Unknown scenarios: {", ".join(unknown)}')
+            return
+
+        with self.throwaway_database(options['users']):
+            results = {
+                'users': options['users'],
+                'concurrency': options['concurrency'],
+                'scenarios': {
+                    name: self.run_scenario(name, options)
+                    for name in scenarios
+                },
+            }
+        self.report(results, options['json'])
+
+    @contextmanager
+    def throwaway_database(self, users):
+        """
+        Create and seed a temporary SQLite test database,
+        dropped on exit. Throttling is off while it is in use
+        """
+        handle, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connection.settings_dict['TEST']['NAME'] = path
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            rest_framework = dict(settings.REST_FRAMEWORK,
+                                  DEFAULT_THROTTLE_RATES={})
+            with override_settings(ALLOWED_HOSTS=['*'], DEBUG=False,
+                                   REST_FRAMEWORK=rest_framework):
+                self.seed(users)
+                yield
+                log = audit_log()
+                if log is not None:
+                    log.close()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def seed(self, count):
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            User(username=f'bench{i}', password=password, is_active=True)
+            for i in range(count)
+        )
+        self.users = list(User.objects.order_by('id').values_list(
+            'id', 'username'
+        ))
+        Token.objects.bulk_create(
+            Token(key=Token.generate_key(), user_id=pk)
+            for pk, username in self.users
+        )
+        self.tokens = dict(Token.objects.values_list('user_id', 'key'))
+
+    def build_requests(self, name, options):
+        count = options['requests']
+        if name == 'delete':
+            count = min(count, len(self.users))
+            users = random.sample(self.users, count)
+            self.users = [user for user in self.users if user not in users]
+        else:
+            users = [random.choice(self.users) for _ in range(count)]
+        for pk, username in users:
+            if name == 'login':
+                yield ('post', reverse('token-auth'),
+                       {'username': username, 'password': PASSWORD}, None)
+            elif name == 'list':
+                params = {}
+                if options['page_size']:
+                    params['page_size'] = options['page_size']
+                yield 'get', reverse('users-list'), params, self.tokens[pk]
+            elif name == 'retrieve':
+                yield ('get', reverse('users-detail', args=[pk]), None,
+                       self.tokens[pk])
+            elif name == 'patch':
+                yield ('patch', reverse('users-detail', args=[pk]),
+                       {'first_name': 'Bench'}, self.tokens[pk])
+            elif name == 'delete':
+                yield ('delete', reverse('users-detail', args=[pk]), None,
+                       self.tokens[pk])
+
+    def worker(self, requests, samples, lock):
+        client = APIClient()
+        local = []
+        try:
+            while True:
+                try:
+                    method, url, data, token = requests.get_nowait()
+                except queue.Empty:
+                    break
+                client.credentials(
+                    **({'HTTP_AUTHORIZATION': 'Token ' + token}
+                       if token else {})
+                )
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = getattr(client, method)(url, data)
+                    elapsed = time.perf_counter() - start
+                local.append(
+                    (elapsed, len(queries), response.status_code < 400)
+                )
+        finally:
+            connections.close_all()
+        with lock:
+            samples.extend(local)
+
+    def run_scenario(self, name, options):
+        requests = queue.Queue()
+        for request in self.build_requests(name, options):
+            requests.put(request)
+        samples = []
+        lock = threading.Lock()
+        threads = [
+            threading.Thread(target=self.worker,
+                             args=(requests, samples, lock))
+            for _ in range(options['concurrency'])
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - start
+
+        latencies = [elapsed * 1000 for elapsed, _, _ in samples]
+        return {
+            'requests': len(samples),
+            'errors': sum(1 for _, _, ok in samples if not ok),
+            'rps': len(samples) / duration if duration else None,
+            'p50_ms': percentile(latencies, 0.50),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+            'queries_per_request': (
+                sum(count for _, count, _ in samples) / len(samples)
+                if samples else None
+            ),
+        }
+
+    def report(self, results, as_json):
+        if as_json:
+            self.stdout.write(json.dumps(results, indent=2, sort_keys=True))
+            return
+        self.stdout.write(
+            f"users={results['users']} "
+            f"concurrency={results['concurrency']} "
+            f"database={settings.DATABASES['default']['ENGINE']}"
+        )
+        for name, result in results['scenarios'].items():
+            self.stdout.write(
+                f"{name:<9}"
+                f"{result['requests']:>6} req {result['errors']:>4} err "
+                f"{result['rps'] or 0:>9.1f} req/s  "
+                f"p50 {result['p50_ms'] or 0:>8.2f} ms  "
+                f"p95 {result['p95_ms'] or 0:>8.2f} ms  "
+                f"p99 {result['p99_ms'] or 0:>8.2f} ms  "
+                f"{result['queries_per_request'] or 0:>5.1f} q/req"
+            )
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.wsgi import get_wsgi_application
+from django.urls import reverse
+
+from test_assignment.asgi import WsgiToAsgi
+
+from .bench_api import Command as BenchCommand, percentile
+
+
+class Command(BenchCommand):
+    help = ('Compare throughput of the WSGI application served by a '
+            'thread per connection and of the ASGI entry point with the same '
+            'number of threads, with many concurrent clients that spend '
+            '--client-delay ms sending each request')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=64,
+                            help='concurrent client connections')
+        parser.add_argument('--threads', type=int, default=8,
+                            help='worker threads in both modes')
+        parser.add_argument('--client-delay', type=float, default=20,
+                            help='ms each client takes to send a request')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        with self.throwaway_database(options['users']):
+            self.wsgi_application = get_wsgi_application()
+            results = {
+                'users': options['users'],
+                'concurrency': options['concurrency'],
+                'threads': options['threads'],
+                'client_delay_ms': options['client_delay'],
+                'modes': {
+                    mode: asyncio.run(self.run_mode(mode, options))
+                    for mode in ('wsgi', 'asgi')
+                },
+            }
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2, sort_keys=True))
+            return
+        for mode, result in results['modes'].items():
+            self.stdout.write(
+                f"{mode}  {result['requests']:>6} req "
+                f"{result['errors']:>4} err "
+                f"{result['rps']:>9.1f} req/s  "
+                f"p50 {result['p50_ms']:>8.2f} ms  "
+                f"p95 {result['p95_ms']:>8.2f} ms  "
+                f"p99 {result['p99_ms']:>8.2f} ms"
+            )
+
+    def scope(self):
+        pk, username = random.choice(self.users)
+        return {
+            'type': 'http',
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': reverse('users-detail', args=[pk]),
+            'query_string': b'',
+            'headers': [
+                (b'host', b'localhost'),
+                (b'authorization', f'Token {self.tokens[pk]}'.encode()),
+            ],
+        }
+
+    def wsgi_request(self, scope, delay):
+        # A threaded WSGI server pins the thread while the client sends
+        time.sleep(delay)
+        statuses = []
+        result = self.wsgi_application(
+            WsgiToAsgi.build_environ(scope, b''),
+            lambda status, headers, exc_info=None: statuses.append(status),
+        )
+        try:
+            b''.join(result)
+        finally:
+            result.close()
+        return int(statuses[0].split(' ', 1)[0])
+
+    async def asgi_request(self, application, scope, delay):
+        statuses = []
+
+        async def receive():
+            await asyncio.sleep(delay)
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        await application(scope, receive, send)
+        return statuses[0]
+
+    async def run_mode(self, mode, options):
+        delay = options['client_delay'] / 1000
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=options['threads'])
+        application = WsgiToAsgi(self.wsgi_application, options['threads'])
+        remaining = [options['requests']]
+        samples = []
+
+        async def client():
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                scope = self.scope()
+                start = time.perf_counter()
+                if mode == 'wsgi':
+                    status = await loop.run_in_executor(
+                        executor, self.wsgi_request, scope, delay
+                    )
+                else:
+                    status = await self.asgi_request(
+                        application, scope, delay
+                    )
+                samples.append((time.perf_counter() - start, status < 400))
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(client() for _ in range(options['concurrency']))
+        )
+        duration = time.perf_counter() - start
+        executor.shutdown()
+        application.executor.shutdown()
+
+        latencies = [elapsed * 1000 for elapsed, _ in samples]
+        return {
+            'requests': len(samples),
+            'errors': sum(1 for _, ok in samples if not ok),
+            'rps': len(samples) / duration,
+            'p50_ms': percentile(latencies, 0.50),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+        }
@@ -0,0 +1,99 @@
+import json
+import random
+import time
+
+from django.db import connection
+from django.test.utils import override_settings
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api_users.authentication import ExpiringTokenAuthentication, token_cache
+from api_users.signed_tokens import (
+    SignedTokenAuthentication, issue, revocations,
+)
+
+from .bench_api import Command as BenchCommand, User
+
+
+SCHEMES = {
+    'authtoken': TokenAuthentication,
+    'cached': ExpiringTokenAuthentication,
+    'signed': SignedTokenAuthentication,
+}
+
+
+class Command(BenchCommand):
+    help = ('Compare the per-request authentication cost of DRF '
+            'TokenAuthentication, the cached token authentication and '
+            'stateless signed tokens')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        stateless = {'ENABLED': True, 'REFRESH_INTERVAL': 5}
+        with self.throwaway_database(options['users']), \
+                override_settings(STATELESS_TOKENS=stateless):
+            token_cache.clear()
+            revocations.clear()
+            users = dict(self.users)
+            signed = {
+                pk: issue(User(pk=pk, username=username))
+                for pk, username in users.items()
+            }
+            picks = [random.choice(list(users))
+                     for _ in range(options['requests'])]
+            results = {
+                'users': options['users'],
+                'requests': options['requests'],
+                'schemes': {
+                    name: self.measure(
+                        scheme(),
+                        [(signed if name == 'signed' else self.tokens)[pk]
+                         for pk in picks]
+                    )
+                    for name, scheme in SCHEMES.items()
+                },
+            }
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, result in results['schemes'].items():
+            self.stdout.write(
+                f"{name:<10}cold {result['cold_us']:8.1f} us/req  "
+                f"warm {result['warm_us']:8.1f} us/req  "
+                f"{result['queries_per_request']:.2f} q/req warm"
+            )
+
+    def measure(self, authentication, keys):
+        factory = APIRequestFactory()
+        requests = [
+            factory.get('/', HTTP_AUTHORIZATION='Token ' + key)
+            for key in keys
+        ]
+        timings = []
+        # The first pass fills the caches, the second shows steady state
+        for _ in range(2):
+            queries = []
+
+            def count(execute, sql, params, many, context):
+                queries.append(sql)
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(count):
+                start = time.perf_counter()
+                for request in requests:
+                    authentication.authenticate(Request(request))
+                elapsed = time.perf_counter() - start
+            timings.append((elapsed / len(requests) * 1e6, len(queries)))
+        return {
+            'cold_us': timings[0][0],
+            'warm_us': timings[1][0],
+            'queries_per_request': timings[1][1] / len(requests),
+        }
@@ -0,0 +1,64 @@
+import json
+from io import BytesIO
+
+from django.core.management.base import CommandError
+
+from api_users.renderers import (
+    ColumnarMessagePackRenderer, FastJSONParser, FastJSONRenderer,
+    MessagePackParser, MessagePackRenderer, msgpack, orjson,
+)
+
+from .bench_json import Command as JSONCommand
+
+
+class Command(JSONCommand):
+    help = ('Compare payload size, render and parse time of a users list '
+            'page in JSON, MessagePack and columnar MessagePack')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        if msgpack is None:
+            raise CommandError('The msgpack package is not installed')
+        # A cursor page as UserViewSet.list() returns it, datetimes are
+        # left to the renderers like FastReadOnlyUserSerializer does
+        page = {'next': None, 'previous': None,
+                'results': self.rows(options['users'])}
+        repeat = options['repeat']
+        formats = {
+            'json': (FastJSONRenderer(), FastJSONParser()),
+            'msgpack': (MessagePackRenderer(), MessagePackParser()),
+            'columnar': (ColumnarMessagePackRenderer(), MessagePackParser()),
+        }
+        results = {
+            'json_backend': 'orjson' if orjson is not None else 'json',
+            'users': options['users'],
+            'formats': {},
+        }
+        for name, (renderer, parser) in formats.items():
+            body = renderer.render(page)
+            results['formats'][name] = {
+                'bytes': len(body),
+                'render_ms': self.timed(lambda: renderer.render(page),
+                                        repeat),
+                'parse_ms': self.timed(
+                    lambda: parser.parse(BytesIO(body)), repeat),
+            }
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"json_backend={results['json_backend']} "
+            f"users={results['users']}"
+        )
+        baseline = results['formats']['json']
+        for name, result in results['formats'].items():
+            self.stdout.write(
+                f"{name:<10}{result['bytes']:>12} bytes "
+                f"({result['bytes'] / baseline['bytes']:.0%})  "
+                f"render {result['render_ms']:9.2f} ms  "
+                f"parse {result['parse_ms']:9.2f} ms"
+            )
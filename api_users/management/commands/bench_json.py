@@ -0,0 +1,96 @@
+import datetime
+import json
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api_users.renderers import FastJSONParser, FastJSONRenderer, orjson
+from api_users.serializers import ReadOnlyUserSerializer
+
+
+class Command(BaseCommand):
+    help = ('Compare the stdlib and the fast JSON renderer and parser '
+            'on a users list page')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--json', action='store_true')
+
+    def rows(self, count):
+        now = timezone.now()
+        return [
+            {
+                'id': i, 'username': f'user{i}', 'first_name': 'Имя',
+                'last_name': f'Фамилия{i}', 'is_active': True,
+                'last_login': now - datetime.timedelta(minutes=i),
+                'is_superuser': False,
+            }
+            for i in range(count)
+        ]
+
+    def timed(self, func, repeat):
+        func()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - start) / repeat * 1000
+
+    def handle(self, *args, **options):
+        native = self.rows(options['users'])
+        field = ReadOnlyUserSerializer().fields['last_login']
+        to_string = field.to_representation
+        strings = [dict(row, last_login=to_string(row['last_login']))
+                   for row in native]
+        body = JSONRenderer().render(strings)
+        repeat = options['repeat']
+
+        def convert_and_render(renderer):
+            return renderer.render([
+                dict(row, last_login=to_string(row['last_login']))
+                for row in native
+            ])
+
+        results = {
+            'backend': 'orjson' if orjson is not None else 'json',
+            'users': options['users'],
+            'bytes': len(body),
+            'render_ms': {
+                'stdlib': self.timed(
+                    lambda: JSONRenderer().render(strings), repeat),
+                'fast': self.timed(
+                    lambda: FastJSONRenderer().render(strings), repeat),
+            },
+            # Datetimes converted by the serializer vs by the renderer
+            'serialize_render_ms': {
+                'stdlib': self.timed(
+                    lambda: convert_and_render(JSONRenderer()), repeat),
+                'fast': self.timed(
+                    lambda: FastJSONRenderer().render(native), repeat),
+            },
+            'parse_ms': {
+                'stdlib': self.timed(
+                    lambda: JSONParser().parse(BytesIO(body)), repeat),
+                'fast': self.timed(
+                    lambda: FastJSONParser().parse(BytesIO(body)), repeat),
+            },
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"backend={results['backend']} users={results['users']} "
+            f"body={results['bytes']} bytes"
+        )
+        for name in ('render_ms', 'serialize_render_ms', 'parse_ms'):
+            result = results[name]
+            self.stdout.write(
+                f"{name:<20}stdlib {result['stdlib']:8.3f} ms  "
+                f"fast {result['fast']:8.3f} ms  "
+                f"x{result['stdlib'] / result['fast']:.1f}"
+            )
@@ -0,0 +1,94 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.password_validation import validate_password
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from api_users.passwords import hasher_pool
+
+
+User = get_user_model()
+
+HASHERS = {
+    'pbkdf2': 'api_users.hashers.TunablePBKDF2PasswordHasher',
+    'argon2': 'api_users.hashers.TunableArgon2PasswordHasher',
+    'bcrypt': 'api_users.hashers.TunableBCryptSHA256PasswordHasher',
+}
+
+
+class Command(BaseCommand):
+    help = ('Measure per-request CPU and wall time of the password work '
+            'done by user create (validators + hash) and login (check) '
+            'under different hasher settings')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=20)
+        parser.add_argument(
+            '--pbkdf2-iterations', default='100000,150000,260000',
+            help='comma separated PBKDF2 iteration counts'
+        )
+        parser.add_argument('--bcrypt-rounds', default='10,12')
+        parser.add_argument('--argon2-time-cost', default='2,4')
+        parser.add_argument('--json', action='store_true')
+
+    def configurations(self, options):
+        for value in options['pbkdf2_iterations'].split(','):
+            yield 'pbkdf2', {'PBKDF2_ITERATIONS': int(value)}
+        for value in options['argon2_time_cost'].split(','):
+            yield 'argon2', {'ARGON2_TIME_COST': int(value)}
+        for value in options['bcrypt_rounds'].split(','):
+            yield 'bcrypt', {'BCRYPT_ROUNDS': int(value)}
+
+    def measure(self, func, rounds):
+        cpu, wall = time.process_time(), time.perf_counter()
+        for _ in range(rounds):
+            func()
+        return {
+            'cpu_ms': (time.process_time() - cpu) * 1000 / rounds,
+            'wall_ms': (time.perf_counter() - wall) * 1000 / rounds,
+        }
+
+    def run_configuration(self, hasher, cost, rounds):
+        password = 'asfaQQWd12'
+        user = User(username='bench', first_name='Bench')
+
+        def create():
+            validate_password(password, user)
+            hasher_pool.make_password(password)
+
+        with override_settings(PASSWORD_HASHERS=[HASHERS[hasher]],
+                               PASSWORD_HASHER_COST=cost):
+            user.password = hasher_pool.make_password(password)
+            return {
+                'hasher': hasher,
+                'cost': cost,
+                'create': self.measure(create, rounds),
+                'login': self.measure(
+                    lambda: hasher_pool.check_password(user, password),
+                    rounds,
+                ),
+            }
+
+    def handle(self, *args, **options):
+        results = []
+        for hasher, cost in self.configurations(options):
+            try:
+                results.append(
+                    self.run_configuration(hasher, cost, options['rounds'])
+                )
+            except ValueError as exc:
+                self.stderr.write(f'{hasher}: skipped ({exc})')
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for result in results:
+            cost = ', '.join(f'{k}={v}' for k, v in result['cost'].items())
+            self.stdout.write(
+                f"{result['hasher']:<8}{cost:<28}"
+                f"create {result['create']['cpu_ms']:8.2f} ms cpu "
+                f"{result['create']['wall_ms']:8.2f} ms wall   "
+                f"login {result['login']['cpu_ms']:8.2f} ms cpu "
+                f"{result['login']['wall_ms']:8.2f} ms wall"
+            )
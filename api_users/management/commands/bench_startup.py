@@ -0,0 +1,92 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+# Runs in a fresh interpreter for every sample, so nothing is imported yet
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from django.urls import resolve
+resolve('/api/v1/users/')
+startup = time.perf_counter() - start
+
+from django.core.handlers.base import BaseHandler
+from django.http import HttpResponse
+from django.test import RequestFactory
+handler = BaseHandler()
+handler._get_response = lambda request: HttpResponse()
+handler.load_middleware()
+request = RequestFactory().get('/api/v1/users/', SERVER_NAME='localhost')
+for _ in range(100):
+    handler.get_response(request)
+requests = %(requests)d
+start = time.perf_counter()
+for _ in range(requests):
+    handler.get_response(request)
+middleware = (time.perf_counter() - start) / requests
+
+print(json.dumps({
+    'startup_ms': startup * 1000,
+    'modules': len(sys.modules),
+    'middleware_us': middleware * 1e6,
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = ('Measure process startup (import, setup, URLconf) and the '
+            'per-request cost of the middleware chain for settings '
+            'profiles, each sample in a fresh interpreter')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles',
+            default='test_assignment.settings,test_assignment.settings_api',
+            help='comma separated settings modules'
+        )
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--requests', type=int, default=5000,
+                            help='requests through the middleware chain')
+        parser.add_argument('--json', action='store_true')
+
+    def sample(self, profile, requests):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=profile)
+        # Production profiles refuse to start without a secret key
+        env.setdefault('DJANGO_SECRET_KEY', 'bench-startup')
+        env.setdefault('DJANGO_ALLOWED_HOSTS', 'localhost')
+        output = subprocess.run(
+            [sys.executable, '-c', CHILD % {'requests': requests}],
+            cwd=settings.BASE_DIR, env=env, check=True,
+            stdout=subprocess.PIPE,
+        ).stdout
+        return json.loads(output)
+
+    def handle(self, *args, **options):
+        results = {}
+        for profile in options['profiles'].split(','):
+            samples = [
+                self.sample(profile, options['requests'])
+                for _ in range(options['runs'])
+            ]
+            results[profile] = {
+                name: statistics.median(sample[name] for sample in samples)
+                for name in ('startup_ms', 'modules', 'middleware_us')
+            }
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for profile, result in results.items():
+            self.stdout.write(
+                f"{profile:<36}"
+                f"startup {result['startup_ms']:8.1f} ms  "
+                f"{result['modules']:>6.0f} modules  "
+                f"middleware {result['middleware_us']:7.1f} us/req"
+            )
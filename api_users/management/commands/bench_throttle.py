@@ -0,0 +1,57 @@
+import json
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from api_users.throttling import LocalCounterStore, SQLiteCounterStore
+
+
+class Command(BaseCommand):
+    help = 'Measure the latency one throttle check adds to a request'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checks', type=int, default=20000)
+        parser.add_argument('--keys', type=int, default=1000,
+                            help='distinct clients')
+        parser.add_argument('--json', action='store_true')
+
+    def measure(self, store, checks, keys):
+        latencies = []
+        for i in range(checks):
+            start = time.perf_counter()
+            store.hit(f'login:client{i % keys}', 60, 10 ** 9, time.time())
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        return {
+            'checks': checks,
+            'mean_us': sum(latencies) / checks * 1e6,
+            'p50_us': latencies[checks // 2] * 1e6,
+            'p99_us': latencies[int(checks * 0.99)] * 1e6,
+        }
+
+    def handle(self, *args, **options):
+        results = {
+            'local': self.measure(
+                LocalCounterStore(), options['checks'], options['keys']
+            ),
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            store = SQLiteCounterStore(
+                os.path.join(directory, 'throttle.sqlite3')
+            )
+            results['sqlite'] = self.measure(
+                store, options['checks'], options['keys']
+            )
+            store.connection.close()
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<8}{result['checks']:>8} checks  "
+                f"mean {result['mean_us']:8.1f} us  "
+                f"p50 {result['p50_us']:8.1f} us  "
+                f"p99 {result['p99_us']:8.1f} us"
+            )
@@ -0,0 +1,202 @@
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 8, 10, 20, 50, 100)
+
+# Label values must stay bounded, any other method is reported as 'other'
+METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE',
+                     'OPTIONS', 'TRACE', 'CONNECT'))
+
+METRICS = {
+    'api_request_duration_seconds': ('Total request latency', TIME_BUCKETS),
+    'api_db_duration_seconds': ('Time spent in SQL queries', TIME_BUCKETS),
+    'api_db_queries': ('SQL queries per request', COUNT_BUCKETS),
+    'api_auth_duration_seconds': ('Time spent in authentication',
+                                  TIME_BUCKETS),
+    'api_permission_duration_seconds': ('Time spent in permission checks',
+                                        TIME_BUCKETS),
+    'api_serializer_duration_seconds': ('Time spent in serializers',
+                                        TIME_BUCKETS),
+}
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram, cheap enough to update on every request
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+
+class Registry:
+
+    def __init__(self):
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, labels, value):
+        key = (name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = Histogram(METRICS[name][1])
+                self.histograms[key] = histogram
+            histogram.observe(value)
+
+    def clear(self):
+        with self._lock:
+            self.histograms.clear()
+
+    def render(self, extra=()):
+        """
+        Prometheus text exposition format (version 0.0.4).
+        'extra' is an iterable of (name, type, help, value) samples
+        """
+        lines = []
+        with self._lock:
+            items = sorted(self.histograms.items())
+        for name, (help_text, buckets) in METRICS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for (metric, labels), histogram in items:
+                if metric != name:
+                    continue
+                label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+                for bound, total in histogram.cumulative():
+                    lines.append(
+                        f'{name}_bucket{{{label_text},le="{bound}"}} {total}'
+                    )
+                lines.append(f'{name}_sum{{{label_text}}} {histogram.sum}')
+                lines.append(
+                    f'{name}_count{{{label_text}}} {histogram.count}'
+                )
+        for name, metric_type, help_text, value in extra:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+_local = threading.local()
+
+
+class RequestMetrics:
+
+    def __init__(self):
+        self.queries = 0
+        self.phases = {'db': 0}
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0) + seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.add('db', time.perf_counter() - start)
+
+
+def current():
+    return getattr(_local, 'metrics', None)
+
+
+@contextmanager
+def phase(name):
+    """
+    Add the time spent in the block to the named phase of the current
+    sampled request, no-op otherwise
+    """
+    metrics = current()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(name, time.perf_counter() - start)
+
+
+class MetricsMiddleware:
+    """
+    Records latency, SQL query count and DB time of a sampled share
+    (settings.API_METRICS['SAMPLE_RATE']) of requests. Queries are
+    counted with execute wrappers, so DEBUG query logging is not needed
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = getattr(settings, 'API_METRICS', {}).get('SAMPLE_RATE', 1.0)
+        if rate <= 0 or random.random() >= rate:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        _local.metrics = metrics
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _local.metrics = None
+        total = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        labels = (
+            ('endpoint', match.view_name if match else 'unmatched'),
+            ('method',
+             request.method if request.method in METHODS else 'other'),
+        )
+        registry.observe('api_request_duration_seconds', labels, total)
+        registry.observe('api_db_queries', labels, metrics.queries)
+        for name, seconds in metrics.phases.items():
+            registry.observe(f'api_{name}_duration_seconds', labels, seconds)
+        return response
+
+
+class InstrumentedViewMixin:
+    """
+    Times authentication and permission checks of DRF views
+    """
+
+    def perform_authentication(self, request):
+        with phase('auth'):
+            super().perform_authentication(request)
+
+    def check_permissions(self, request):
+        with phase('permission'):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        with phase('permission'):
+            super().check_object_permissions(request, obj)
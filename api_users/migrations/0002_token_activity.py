@@ -0,0 +1,31 @@
+# Generated by Django 2.2 on 2026-10-17 12:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authtoken', '0003_tokenproxy'),
+        ('api_users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenActivity',
+            fields=[
+                ('token', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='activity', serialize=False, to='authtoken.Token')),
+                ('last_used', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name_plural': 'token activities',
+            },
+        ),
+        # Lets purge_tokens find expired tokens without a full scan
+        migrations.RunSQL(
+            'CREATE INDEX api_users_token_created_idx '
+            'ON authtoken_token (created)',
+            'DROP INDEX api_users_token_created_idx',
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        # After the last auth migration: SQLite table rebuilds
+        # drop indexes created outside of the model state
+        ('auth', '0011_update_proxy_permissions'),
+        ('api_users', '0002_token_activity'),
+    ]
+
+    # Indexes behind UserFilterBackend, username is already unique
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX api_users_user_active_login_idx '
+            'ON auth_user (is_active, last_login)',
+            'DROP INDEX api_users_user_active_login_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX api_users_user_last_login_idx '
+            'ON auth_user (last_login)',
+            'DROP INDEX api_users_user_last_login_idx',
+        ),
+    ]
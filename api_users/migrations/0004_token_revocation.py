@@ -0,0 +1,21 @@
+# Generated by Django 2.2 on 2026-10-17 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_users', '0003_user_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenRevocation',
+            fields=[
+                ('user_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('modified', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
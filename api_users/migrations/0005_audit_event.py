@@ -0,0 +1,25 @@
+# Generated by Django 2.2 on 2026-10-17 12:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_users', '0004_token_revocation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('created', models.DateTimeField(db_index=True)),
+                ('action', models.CharField(choices=[('create', 'create'), ('update', 'update'), ('delete', 'delete'), ('login', 'login')], max_length=16)),
+                ('user_id', models.IntegerField(db_index=True)),
+                ('actor_id', models.IntegerField(null=True)),
+                ('fields', models.TextField(blank=True)),
+                ('remote_addr', models.GenericIPAddressField(null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2 on 2026-10-17 12:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    """
+    Existing users enter the feed in id order
+    """
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    UserChange = apps.get_model('api_users', 'UserChange')
+    db = schema_editor.connection.alias
+    ids = User.objects.using(db).order_by('pk').values_list('pk', flat=True)
+    UserChange.objects.using(db).bulk_create(
+        (UserChange(user_id=pk) for pk in ids.iterator()), batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api_users', '0005_audit_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('user_id', models.IntegerField(unique=True)),
+                ('deleted', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
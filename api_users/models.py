@@ -1,3 +1,180 @@
 from django.db import models
+from django.db.models import F, Subquery
+from django.utils import timezone
 
-# Create your models here.
+from rest_framework.authtoken.models import Token
+
+
+class ChangeCounterManager(models.Manager):
+
+    def bump(self, name):
+        now = timezone.now()
+        updated = self.filter(name=name).update(
+            value=F('value') + 1, modified=now
+        )
+        if not updated:
+            self.get_or_create(name=name, defaults={'value': 1,
+                                                    'modified': now})
+
+    def state(self, name):
+        """
+        (value, modified) of the counter, (0, None) before the first bump
+        """
+        return self.filter(name=name).values_list(
+            'value', 'modified'
+        ).first() or (0, None)
+
+    def user_state(self, name, user_id):
+        """
+        state() plus the change feed sequence number of one user
+        (None if the feed has no entry for it), in a single query
+        """
+        seq = UserChange.objects.filter(user_id=user_id).values('seq')[:1]
+        return self.filter(name=name).annotate(
+            user_seq=Subquery(seq)
+        ).values_list('value', 'modified', 'user_seq').first() or (
+            0, None, None
+        )
+
+
+class ChangeCounter(models.Model):
+    """
+    Monotonic per-table change counter, bumped on every write to the
+    table. Lets conditional GETs be answered without loading the rows
+    """
+
+    USERS = 'users'
+
+    name = models.CharField(max_length=64, primary_key=True)
+    value = models.BigIntegerField(default=0)
+    modified = models.DateTimeField(default=timezone.now)
+
+    objects = ChangeCounterManager()
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
+
+
+class TokenActivity(models.Model):
+    """
+    Last time a token authenticated a request. Written in coalesced
+    batches by 'api_users.authentication.TokenUsageBuffer'
+    """
+
+    token = models.OneToOneField(
+        Token, on_delete=models.CASCADE, primary_key=True,
+        related_name='activity'
+    )
+    last_used = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name_plural = 'token activities'
+
+    def __str__(self):
+        return f'{self.token_id}: {self.last_used}'
+
+
+class TokenRevocationManager(models.Manager):
+
+    def revoke(self, user_ids):
+        """
+        Invalidate every signed token issued to 'user_ids' so far
+        """
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        now = timezone.now()
+        self.filter(user_id__in=user_ids).update(
+            version=F('version') + 1, modified=now
+        )
+        self.bulk_create(
+            [self.model(user_id=pk, version=1, modified=now)
+             for pk in user_ids],
+            ignore_conflicts=True,
+        )
+
+    def version(self, user_id):
+        return self.filter(user_id=user_id).values_list(
+            'version', flat=True
+        ).first() or 0
+
+
+class TokenRevocation(models.Model):
+    """
+    Per-user version of stateless signed tokens
+    (api_users.signed_tokens): tokens carrying an older version are
+    revoked. Rows are kept after the user is deleted
+    """
+
+    user_id = models.IntegerField(primary_key=True)
+    version = models.PositiveIntegerField(default=0)
+    modified = models.DateTimeField(db_index=True)
+
+    objects = TokenRevocationManager()
+
+    def __str__(self):
+        return f'{self.user_id}: {self.version}'
+
+
+class AuditEvent(models.Model):
+    """
+    Append-only record of user changes and logins, written in batches
+    off the request path by 'api_users.audit.AuditLog'
+    """
+
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    LOGIN = 'login'
+    ACTIONS = (
+        (CREATE, 'create'),
+        (UPDATE, 'update'),
+        (DELETE, 'delete'),
+        (LOGIN, 'login'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    created = models.DateTimeField(db_index=True)
+    action = models.CharField(max_length=16, choices=ACTIONS)
+    # Plain ids: events outlive the users they describe
+    user_id = models.IntegerField(db_index=True)
+    actor_id = models.IntegerField(null=True)
+    # Comma separated names of the written fields, never their values
+    fields = models.TextField(blank=True)
+    remote_addr = models.GenericIPAddressField(null=True)
+
+    def __str__(self):
+        return f'{self.created} {self.action} {self.user_id}'
+
+
+class UserChangeManager(models.Manager):
+
+    def record(self, user_ids, deleted=False):
+        """
+        Move 'user_ids' to the end of the feed. Call in the transaction
+        that bumped the users ChangeCounter: its row lock makes
+        sequence numbers become visible in order
+        """
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        self.filter(user_id__in=user_ids).delete()
+        self.bulk_create(
+            [self.model(user_id=pk, deleted=deleted) for pk in user_ids]
+        )
+
+
+class UserChange(models.Model):
+    """
+    Latest change of every user, ordered by a sequence number that only
+    grows. Deleted users stay as tombstones. Backs the users change feed
+    """
+
+    seq = models.BigAutoField(primary_key=True)
+    user_id = models.IntegerField(unique=True)
+    deleted = models.BooleanField(default=False)
+
+    objects = UserChangeManager()
+
+    def __str__(self):
+        return f'{self.seq}: {self.user_id}'
@@ -0,0 +1,50 @@
+from django.conf import settings
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+class UserCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the primary key: every page is a
+    'WHERE id > cursor ORDER BY id LIMIT n' query, so latency does not
+    depend on page depth. Enabled when the client passes 'cursor' or
+    'page_size', plain list responses are kept for other requests
+    unless settings.USERS_PAGINATION['REQUIRED'] is set
+    """
+
+    ordering = 'id'
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_position = 2 ** 63 - 1
+
+    def __init__(self):
+        options = getattr(settings, 'USERS_PAGINATION', {})
+        self.page_size = options.get('PAGE_SIZE', 100)
+        self.max_page_size = options.get('MAX_PAGE_SIZE', 1000)
+        self.required = options.get('REQUIRED', False)
+
+    def is_requested(self, request):
+        return self.required or any(
+            param in request.query_params
+            for param in (self.cursor_query_param, self.page_size_query_param)
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def decode_cursor(self, request):
+        # The position ends up in 'WHERE id > position', a tampered cursor
+        # must not reach the database as a non-integer or an overflow
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+        try:
+            position = int(cursor.position)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not 0 <= position <= self.max_position:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
@@ -0,0 +1,125 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.password_validation import CommonPasswordValidator
+
+from rest_framework.exceptions import APIException
+
+
+UserModel = get_user_model()
+
+
+class HasherPoolBusy(APIException):
+    status_code = 503
+    default_detail = 'Password hashing capacity exhausted, try again later.'
+    default_code = 'hasher_pool_busy'
+
+
+class HasherPool:
+    """
+    Bounded thread pool for password hashing. hashlib and the argon2/bcrypt
+    bindings release the GIL, so hashes run in parallel while
+    'max_pending' caps how many requests may queue for a worker;
+    the rest wait up to 'timeout' seconds and then get HTTP 503.
+    Workers never touch the database
+    """
+
+    def __init__(self, workers=4, max_pending=16, timeout=10):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix='hasher',
+                    )
+        return self._executor
+
+    def run(self, func, *args):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HasherPoolBusy()
+        try:
+            return self.executor.submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def make_password(self, raw_password):
+        return self.run(make_password, raw_password)
+
+    def check_password(self, user, raw_password):
+        """
+        User.check_password() with the hash computed in the pool.
+        Outdated hashes are upgraded from the calling thread
+        """
+        outdated = []
+        valid = self.run(
+            check_password, raw_password, user.password,
+            lambda raw: outdated.append(True),
+        )
+        if valid and outdated:
+            user.password = self.make_password(raw_password)
+            user.save(update_fields=['password'])
+        return valid
+
+
+def _build_hasher_pool():
+    options = getattr(settings, 'PASSWORD_HASHER_POOL', {})
+    return HasherPool(
+        workers=options.get('WORKERS', 4),
+        max_pending=options.get('MAX_PENDING', 16),
+        timeout=options.get('TIMEOUT', 10),
+    )
+
+
+hasher_pool = _build_hasher_pool()
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend that checks passwords through 'hasher_pool'
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Keep the timing of unknown usernames close to known ones
+            hasher_pool.make_password(password)
+            return None
+        if (hasher_pool.check_password(user, password)
+                and self.user_can_authenticate(user)):
+            return user
+        return None
+
+
+class FrozenCommonPasswordValidator(CommonPasswordValidator):
+    """
+    CommonPasswordValidator that reads the password list once per process
+    into a shared frozenset instead of once per validator instance
+    """
+
+    _lists = {}
+    _lock = threading.Lock()
+
+    def __init__(self, password_list_path=None):
+        path = str(password_list_path or self.DEFAULT_PASSWORD_LIST_PATH)
+        with self._lock:
+            if path not in self._lists:
+                super().__init__(path)
+                self._lists[path] = frozenset(self.passwords)
+        self.passwords = self._lists[path]
@@ -2,16 +2,35 @@ from rest_framework import permissions
 
 
 class IsAuthorOrAdminOrReadOnly(permissions.BasePermission):
+    """
+    Non-superusers may only change their own account. The URL already
+    names the target, so requests for someone else's id are refused
+    before the object is loaded
+    """
+
     def has_permission(self, request, view):
         if request.method in permissions.SAFE_METHODS:
             return True
         user = request.user
         if request.method == 'POST':
             return user.is_superuser
-        return user.is_authenticated
+        if not user.is_authenticated:
+            return False
+        lookup = view.kwargs.get(
+            getattr(view, 'lookup_url_kwarg', None)
+            or getattr(view, 'lookup_field', 'pk')
+        )
+        if lookup is None or user.is_superuser:
+            return True
+        return str(lookup) == str(user.pk)
 
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
         user = request.user
         return obj == user or user.is_superuser
+
+
+class IsSuperUser(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_superuser)
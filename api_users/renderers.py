@@ -0,0 +1,199 @@
+import datetime
+from operator import itemgetter
+
+from django.conf import settings
+
+from rest_framework.exceptions import ParseError
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+_default = JSONEncoder().default
+
+
+def dumps(data):
+    """
+    Compact JSON bytes of 'data' with the fast backend when it is
+    installed, types it does not know go through DRF's JSONEncoder
+    """
+    if orjson is None:
+        return JSONEncoder(
+            ensure_ascii=False, separators=(',', ':')
+        ).encode(data).encode()
+    return orjson.dumps(
+        data, default=_default,
+        option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+    )
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer producing the same bytes through orjson, which writes
+    dict and list subclasses (ReturnDict, ReturnList, OrderedDict) and
+    datetimes directly instead of going through JSONEncoder.default().
+    Indented output, ASCII-only or non-compact settings and a missing
+    orjson fall back to the stdlib renderer.
+    Serializers may leave values of 'native_types' unconverted, both
+    paths write them like DRF's fields do
+    """
+
+    native_types = (datetime.datetime,)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type,
+                                   renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        if data is None:
+            return b''
+        try:
+            ret = dumps(data)
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits and the like
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        # Same escaping of U+2028 and U+2029 as JSONRenderer
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+                b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser reading UTF-8 bodies with orjson in one call. orjson
+    rejects NaN and Infinity like the strict stdlib parser
+    """
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if (orjson is None or not self.strict
+                or encoding.lower().replace('-', '') != 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+def packb(data):
+    """
+    MessagePack bytes of 'data', types it does not know (datetimes,
+    decimals, ...) are written as the strings JSON would contain
+    """
+    return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+def _table(items):
+    if not all(isinstance(item, dict) for item in items):
+        return items
+    if not items:
+        return {'columns': [], 'rows': []}
+    columns = list(items[0])
+    if any(len(item) != len(columns) for item in items):
+        return items
+    get = itemgetter(*columns)
+    try:
+        rows = [get(item) for item in items]
+    except KeyError:
+        return items
+    if len(columns) == 1:
+        rows = [(value,) for value in rows]
+    return {'columns': columns, 'rows': rows}
+
+
+def columnar(data):
+    """
+    Lists of dicts sharing their keys, the response itself or the
+    'results' of a page, as {'columns': [...], 'rows': [[...], ...]}.
+    Other data is left as it is
+    """
+    if isinstance(data, list):
+        return _table(data)
+    if isinstance(data, dict) and isinstance(data.get('results'), list):
+        return dict(data, results=_table(data['results']))
+    return data
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack for internal consumers, requested with
+    'Accept: application/msgpack' or '?format=msgpack'.
+    Only offered when the msgpack package is installed
+    """
+
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    available = msgpack is not None
+    native_types = (datetime.datetime,)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return packb(data)
+
+
+class ColumnarMessagePackRenderer(MessagePackRenderer):
+    """
+    MessagePack with lists of objects written as column names once and
+    rows of values, see columnar()
+    """
+
+    media_type = 'application/vnd.users.columnar+msgpack'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return packb(columnar(data))
+
+
+class MessagePackParser(BaseParser):
+    """
+    Parses MessagePack request bodies, only offered when the msgpack
+    package is installed
+    """
+
+    media_type = 'application/msgpack'
+    available = msgpack is not None
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, TypeError) as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
+
+
+class ContentNegotiation(DefaultContentNegotiation):
+    """
+    Leaves out renderers and parsers whose backend is not installed
+    """
+
+    def select_parser(self, request, parsers):
+        return super().select_parser(request, [
+            parser for parser in parsers if getattr(parser, 'available', True)
+        ])
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return super().select_renderer(request, [
+            renderer for renderer in renderers
+            if getattr(renderer, 'available', True)
+        ], format_suffix)
@@ -0,0 +1,54 @@
+from functools import partial, wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from .conditional import users_etag
+
+
+def _options():
+    return getattr(settings, 'USERS_RESPONSE_CACHE', {})
+
+
+def cache_anonymous_response(view_method=None, key_func=users_etag):
+    """
+    Cache rendered responses of anonymous GETs in the CACHES alias
+    settings.USERS_RESPONSE_CACHE['BACKEND'] (None disables the cache).
+    Keys come from 'key_func', users ETags by default, which contain the
+    users table version, so every write makes the old entries unreachable
+    and no explicit purge is needed. Single user responses pass
+    'user_etag' to survive writes to other users
+    """
+    if view_method is None:
+        return partial(cache_anonymous_response, key_func=key_func)
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        alias = _options().get('BACKEND')
+        if (alias is None or request.method != 'GET'
+                or request.user.is_authenticated):
+            return view_method(self, request, *args, **kwargs)
+
+        etag = key_func(request, *args, **kwargs)
+        if etag is None:
+            return view_method(self, request, *args, **kwargs)
+
+        cache = caches[alias]
+        key = 'api_users:response:' + etag
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            timeout = _options().get('TIMEOUT', 300)
+            response.add_post_render_callback(
+                lambda rendered: cache.set(
+                    key, (rendered.content, rendered['Content-Type']), timeout
+                )
+            )
+        return response
+
+    return wrapper
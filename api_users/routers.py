@@ -0,0 +1,58 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+_local = threading.local()
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """
+    Route reads made inside the block to settings.DATABASE_REPLICAS
+    """
+    previous = getattr(_local, 'enabled', False)
+    _local.enabled = enabled
+    try:
+        yield
+    finally:
+        _local.enabled = previous
+
+
+class ReplicaRouter:
+    """
+    Sends reads to a random replica while 'replica_reads' is active and
+    everything else to the default database. Replicas are expected to
+    mirror 'default', so relations between them are allowed and
+    migrations run on 'default' only
+    """
+
+    def replicas(self):
+        return getattr(settings, 'DATABASE_REPLICAS', [])
+
+    def db_for_read(self, model, **hints):
+        replicas = self.replicas()
+        if replicas and getattr(_local, 'enabled', False):
+            return random.choice(replicas)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in self.replicas()
+
+
+class ReplicaReadMixin:
+    """
+    Serves safe-method requests of a DRF view from replicas
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with replica_reads(request.method in ('GET', 'HEAD', 'OPTIONS')):
+            return super().dispatch(request, *args, **kwargs)
@@ -1,6 +1,15 @@
+import datetime
+
 from django.contrib.auth import get_user_model
+from django.contrib.auth.password_validation import validate_password
+from django.db import models
+from django.utils import timezone
+
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 
-from rest_framework import serializers
+from . import metrics
+from .passwords import hasher_pool
 
 
 User = get_user_model()
@@ -23,3 +32,131 @@ class WriteOnlyUserSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'is_active': {'required': True}
         }
+
+    def validate_password(self, value):
+        """
+        Run AUTH_PASSWORD_VALIDATORS and return the hash computed
+        in the hasher pool, so only hashes reach validated_data
+        """
+        user = self.instance
+        if user is None:
+            user = User(**{
+                name: self.initial_data.get(name, '')
+                for name in ('username', 'first_name', 'last_name')
+            })
+        validate_password(value, user)
+        return hasher_pool.make_password(value)
+
+    def is_valid(self, raise_exception=False):
+        with metrics.phase('serializer'):
+            return super().is_valid(raise_exception=raise_exception)
+
+
+class FastReadOnlyUserSerializer:
+    """
+    Drop-in replacement for ReadOnlyUserSerializer as a read serializer
+    with identical output. Querysets are read with values_list() and
+    instances with plain getattr(), and every value goes through a
+    converter compiled once from the source serializer's fields:
+    types the database already returns in their JSON form (int, str,
+    bool) are passed through untouched.
+    'fields' restricts the output (and the selected columns) to a subset.
+    ISO 8601 datetimes are left to the accepted renderer when it lists
+    datetime in 'native_types' and writes the same string
+    """
+
+    source_serializer = ReadOnlyUserSerializer
+    passthrough_fields = (serializers.IntegerField, serializers.CharField,
+                          serializers.BooleanField)
+    _converters = {}
+
+    def __init__(self, instance=None, many=False, context=None,
+                 fields=None, **kwargs):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+        self.converters = self.select(fields, self.native_types())
+
+    def native_types(self):
+        renderer = getattr(
+            self.context.get('request'), 'accepted_renderer', None
+        )
+        native = getattr(renderer, 'native_types', ())
+        # DateTimeField would convert to the current time zone first
+        if (datetime.datetime in native
+                and timezone.get_current_timezone_name() != 'UTC'):
+            native = tuple(
+                kind for kind in native if kind is not datetime.datetime
+            )
+        return native
+
+    @classmethod
+    def is_native(cls, field, native):
+        if type(field) in cls.passthrough_fields:
+            return True
+        return (type(field) is serializers.DateTimeField
+                and datetime.datetime in native
+                and not hasattr(field, 'timezone')
+                and getattr(field, 'format', api_settings.DATETIME_FORMAT)
+                == ISO_8601)
+
+    @classmethod
+    def all_converters(cls, native=()):
+        key = (cls, native)
+        if key not in cls._converters:
+            cls._converters[key] = [
+                (name, None if cls.is_native(field, native)
+                 else field.to_representation)
+                for name, field in cls.source_serializer().fields.items()
+            ]
+        return cls._converters[key]
+
+    @classmethod
+    def allowed_fields(cls):
+        return [name for name, convert in cls.all_converters()]
+
+    @classmethod
+    def select(cls, fields=None, native=()):
+        if fields is None:
+            return cls.all_converters(native)
+        return [
+            (name, convert) for name, convert in cls.all_converters(native)
+            if name in fields
+        ]
+
+    @staticmethod
+    def to_row(converters, values):
+        return {
+            name: value if convert is None or value is None
+            else convert(value)
+            for (name, convert), value in zip(converters, values)
+        }
+
+    @classmethod
+    def iter_rows(cls, queryset, chunk_size=2000, fields=None):
+        converters = cls.select(fields)
+        values = queryset.values_list(*(name for name, _ in converters))
+        for row in values.iterator(chunk_size=chunk_size):
+            yield cls.to_row(converters, row)
+
+    @property
+    def field_names(self):
+        return [name for name, convert in self.converters]
+
+    def to_representation(self, instance):
+        return self.to_row(
+            self.converters,
+            (getattr(instance, name) for name in self.field_names)
+        )
+
+    @property
+    def data(self):
+        with metrics.phase('serializer'):
+            if not self.many:
+                return self.to_representation(self.instance)
+            if isinstance(self.instance, models.QuerySet):
+                return [
+                    self.to_row(self.converters, row) for row in
+                    self.instance.values_list(*self.field_names)
+                ]
+            return [self.to_representation(item) for item in self.instance]
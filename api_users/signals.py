@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .models import ChangeCounter, TokenRevocation, UserChange
+from .signed_tokens import AUTH_FIELDS, revocations
+
+
+User = get_user_model()
+
+# Sent after writes that bypass post_save
+# (bulk_create, bulk_update, QuerySet.update). 'fields' lists the
+# written fields when the sender knows them
+users_changed = Signal(providing_args=['pks', 'fields'])
+
+
+@receiver([post_save, post_delete], sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    token_cache.delete(instance.key)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_tokens(sender, instance, **kwargs):
+    token_cache.delete_user(instance.pk)
+
+
+@receiver(users_changed, sender=User)
+def invalidate_bulk_user_tokens(sender, pks, **kwargs):
+    for pk in pks:
+        token_cache.delete_user(pk)
+
+
+def track_user_changes(pks, deleted=False):
+    with transaction.atomic():
+        ChangeCounter.objects.bump(ChangeCounter.USERS)
+        UserChange.objects.record(pks, deleted=deleted)
+
+
+@receiver(post_save, sender=User)
+def track_saved_user(sender, instance, **kwargs):
+    track_user_changes([instance.pk])
+
+
+@receiver(post_delete, sender=User)
+def track_deleted_user(sender, instance, **kwargs):
+    track_user_changes([instance.pk], deleted=True)
+
+
+@receiver(users_changed, sender=User)
+def track_bulk_user_changes(sender, pks, **kwargs):
+    track_user_changes(pks)
+
+
+def revoke_signed_tokens(pks):
+    TokenRevocation.objects.revoke(pks)
+    revocations.expire()
+
+
+@receiver(post_save, sender=User)
+def revoke_saved_user_tokens(sender, instance, created, update_fields,
+                             **kwargs):
+    if not created and (update_fields is None
+                        or AUTH_FIELDS.intersection(update_fields)):
+        revoke_signed_tokens([instance.pk])
+
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    revoke_signed_tokens([instance.pk])
+
+
+@receiver(users_changed, sender=User)
+def revoke_bulk_user_tokens(sender, pks, fields=None, **kwargs):
+    if fields is None or AUTH_FIELDS.intersection(fields):
+        revoke_signed_tokens(pks)
@@ -0,0 +1,168 @@
+import base64
+import hashlib
+import hmac
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from .authentication import token_expired
+from .models import TokenRevocation
+
+
+User = get_user_model()
+
+# Changes of these fields revoke the signed tokens of the user
+AUTH_FIELDS = frozenset(['password', 'is_active', 'is_superuser',
+                         'is_staff'])
+
+SUPERUSER = 1
+STAFF = 2
+
+SignedToken = namedtuple('SignedToken',
+                         ['key', 'user_id', 'created', 'version'])
+
+
+def enabled():
+    return getattr(settings, 'STATELESS_TOKENS', {}).get('ENABLED', False)
+
+
+class RevocationMap:
+    """
+    In-memory user id -> token version map mirroring TokenRevocation.
+    Only rows modified since the previous refresh are read, at most
+    once per 'interval' seconds, so verifying a token normally runs no
+    query; revocations reach other processes within 'interval' seconds
+    """
+
+    # Rows committed late by a slow writer are still picked up
+    overlap = timedelta(seconds=60)
+
+    def __init__(self, interval=5):
+        self.interval = interval
+        self.versions = {}
+        self._since = None
+        self._checked = None
+        self._lock = threading.Lock()
+
+    def version(self, user_id):
+        checked = self._checked
+        if checked is None or time.monotonic() - checked >= self.interval:
+            self.refresh()
+        return self.versions.get(user_id, 0)
+
+    def refresh(self):
+        with self._lock:
+            rows = TokenRevocation.objects.all()
+            if self._since is not None:
+                rows = rows.filter(modified__gte=self._since - self.overlap)
+            newest = self._since
+            for user_id, version, modified in rows.values_list(
+                    'user_id', 'version', 'modified'):
+                if version > self.versions.get(user_id, 0):
+                    self.versions[user_id] = version
+                if newest is None or modified > newest:
+                    newest = modified
+            self._since = newest
+            self._checked = time.monotonic()
+
+    def expire(self):
+        """
+        Refresh on the next lookup, used after local revocations
+        """
+        self._checked = None
+
+    def clear(self):
+        with self._lock:
+            self.versions = {}
+            self._since = None
+            self._checked = None
+
+
+def _build_revocations():
+    options = getattr(settings, 'STATELESS_TOKENS', {})
+    return RevocationMap(interval=options.get('REFRESH_INTERVAL', 5))
+
+
+revocations = _build_revocations()
+
+_keys = {}
+
+
+def _signature(payload):
+    secret = settings.SECRET_KEY
+    key = _keys.get(secret)
+    if key is None:
+        key = _keys[secret] = hashlib.sha256(
+            ('api_users.signed_tokens:' + secret).encode()
+        ).digest()
+    digest = hmac.new(key, payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+def issue(user, now=None):
+    """
+    Signed '<user id>.<issued>.<version>.<flags>.<signature>' token
+    for 'user', valid until revoked or expired
+    (settings.TOKEN_EXPIRY['MAX_AGE'])
+    """
+    flags = ((SUPERUSER if user.is_superuser else 0)
+             | (STAFF if user.is_staff else 0))
+    payload = '{}.{}.{}.{}'.format(
+        user.pk, int(now or time.time()),
+        TokenRevocation.objects.version(user.pk), flags,
+    )
+    return payload + '.' + _signature(payload)
+
+
+class SignedTokenAuthentication(TokenAuthentication):
+    """
+    Verifies the stateless tokens LoginToken issues with
+    settings.STATELESS_TOKENS['ENABLED'] from the signature, the issue
+    time and 'revocations' alone. request.user only holds id and flags,
+    other fields are loaded from the database on first access.
+    Keys that are not signed tokens are left to the next class
+    """
+
+    stub_fields = [
+        field.attname for field in User._meta.concrete_fields
+        if field.attname in (User._meta.pk.attname, 'is_superuser',
+                             'is_staff', 'is_active')
+    ]
+
+    def authenticate_credentials(self, key):
+        if not enabled() or key.count('.') != 4:
+            return None
+        payload, signature = key.rsplit('.', 1)
+        # Bytes: compare_digest() refuses str with non-ASCII characters
+        if not hmac.compare_digest(_signature(payload).encode(),
+                                   signature.encode()):
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        user_id, issued, version, flags = map(int, payload.split('.'))
+        token = SignedToken(
+            key, user_id,
+            datetime.fromtimestamp(issued, dt_timezone.utc), version,
+        )
+        if token_expired(token):
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        if version < revocations.version(user_id):
+            raise exceptions.AuthenticationFailed(_('Token has been revoked.'))
+        values = {
+            User._meta.pk.attname: user_id,
+            'is_superuser': bool(flags & SUPERUSER),
+            'is_staff': bool(flags & STAFF),
+            'is_active': True,
+        }
+        user = User.from_db(
+            DEFAULT_DB_ALIAS, self.stub_fields,
+            [values[name] for name in self.stub_fields],
+        )
+        return (user, token)
@@ -1,16 +1,79 @@
+import asyncio
+import base64
+import datetime
+import importlib
 import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.core.signals import request_finished
+from django.core.wsgi import get_wsgi_application
+from django.core.cache import caches
+from django.db import IntegrityError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
 from rest_framework import status
 from rest_framework.authtoken.models import Token
-from rest_framework.test import APIClient
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+from rest_framework.test import APIClient, APIRequestFactory
+
+from test_assignment.asgi import WsgiToAsgi
+
+from .audit import AuditLog, NDJSONSink, audit_log
+from .authentication import (
+    TokenCache, TokenUsageBuffer, token_cache, token_usage,
+)
+from .filters import UserFilterBackend
+from .management.commands.purge_tokens import (
+    Command as PurgeTokensCommand,
+)
+from .metrics import registry as metrics_registry
+from .models import AuditEvent, TokenActivity, TokenRevocation, UserChange
+from .passwords import FrozenCommonPasswordValidator
+from .renderers import (
+    ColumnarMessagePackRenderer, FastJSONParser, FastJSONRenderer,
+    MessagePackParser, MessagePackRenderer, msgpack,
+)
+from .signals import users_changed
+from .signed_tokens import (
+    RevocationMap, SignedTokenAuthentication, issue, revocations,
+)
+from .serializers import FastReadOnlyUserSerializer, ReadOnlyUserSerializer
+from .throttling import SQLiteCounterStore, counter_store
 
 User = get_user_model()
 
 
+# The audit worker thread cannot write to the test database while a
+# TestCase transaction holds it, AuditTest enables the log itself
+_audit_disabled = override_settings(AUDIT_LOG={'ENABLED': False})
+
+
+def setUpModule():
+    _audit_disabled.enable()
+
+
+def tearDownModule():
+    _audit_disabled.disable()
+
+
 class UserAPITest(TestCase):
     def setUp(self):
         self.client_jerry = APIClient()
@@ -339,3 +402,1795 @@ class AuthTest(TestCase):
             response.status_code, status.HTTP_204_NO_CONTENT,
             'Проверьте, что генерируется правильный токен'
         )
+
+
+class TokenCacheTest(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        token_usage.flush()
+        self.client = APIClient()
+        self.user_tom = User.objects.create_user(
+            username='tom',
+            password='A12345a!',
+            is_superuser=False
+        )
+        self.token = Token.objects.create(user=self.user_tom)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+    def test_cached_token_skips_db(self):
+        self.client.delete(reverse('users-detail', args=[0]))
+        with self.assertNumQueries(0):
+            response = self.client.delete(
+                reverse('users-detail', args=[0])
+            )
+        self.assertEqual(
+            response.status_code, status.HTTP_403_FORBIDDEN,
+            'Проверьте, что токен из кеша аутентифицирует пользователя'
+        )
+        self.assertGreaterEqual(token_cache.stats()['hits'], 1)
+
+    def test_deactivated_user_rejected(self):
+        self.client.delete(reverse('users-detail', args=[0]))
+        self.user_tom.is_active = False
+        self.user_tom.save()
+        response = self.client.delete(reverse('users-detail', args=[0]))
+        self.assertEqual(
+            response.status_code, status.HTTP_401_UNAUTHORIZED,
+            ('Проверьте, что после деактивации пользователя'
+             ' токен из кеша не принимается')
+        )
+
+    def test_rotated_token_rejected(self):
+        self.client.delete(reverse('users-detail', args=[0]))
+        self.token.delete()
+        Token.objects.create(user=self.user_tom)
+        response = self.client.delete(reverse('users-detail', args=[0]))
+        self.assertEqual(
+            response.status_code, status.HTTP_401_UNAUTHORIZED,
+            'Проверьте, что удаленный токен из кеша не принимается'
+        )
+
+    def test_password_not_cached(self):
+        token_cache.set(self.token)
+        entry = token_cache.local.get(self.token.key)
+        self.assertNotIn(
+            self.user_tom.password, entry[2],
+            'Проверьте, что хеш пароля не попадает в кеш токенов'
+        )
+        user = token_cache.get(self.token.key).user
+        self.assertIn('password', user.get_deferred_fields())
+        self.assertEqual(user.username, 'tom')
+
+    def test_invalidation_reaches_other_processes(self):
+        caches['default'].clear()
+        worker, other = (TokenCache(backend='default') for _ in range(2))
+        worker.set(self.token)
+        other.set(self.token)
+        self.assertIsNotNone(other.get(self.token.key))
+        worker.delete_user(self.user_tom.pk)
+        self.assertIsNone(
+            other.get(self.token.key),
+            'Проверьте, что сброс кеша юзера виден другим процессам'
+        )
+        other.set(self.token)
+        self.assertIsNotNone(worker.get(self.token.key))
+
+    def test_user_index_bounded(self):
+        cache = TokenCache(max_size=5, ttl=300)
+        for i in range(50):
+            cache.set(Token(key=f'key{i}', user=self.user_tom))
+        cache.delete('key49')
+        self.assertEqual(
+            cache._user_keys, {self.user_tom.pk: {f'key{i}'
+                                                  for i in range(45, 49)}},
+            'Проверьте, что индекс ключей по юзерам не растёт '
+            'при вытеснении и удалении'
+        )
+        cache.local.ttl = -1
+        cache.set(Token(key='expired', user=self.user_tom))
+        self.assertIsNone(cache.get('expired'))
+        self.assertNotIn('expired', cache._user_keys[self.user_tom.pk])
+        cache.clear()
+        self.assertEqual(cache._user_keys, {})
+
+
+class PaginationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for i in range(5):
+            User.objects.create_user(username=f'user{i}', password='A12345a!')
+
+    def test_cursor_pages(self):
+        response = self.client.get(reverse('users-list'), {'page_size': 2})
+        data = json.loads(response.content)
+        self.assertEqual(
+            [user['username'] for user in data['results']],
+            ['user0', 'user1'],
+            'Проверьте, что первая страница упорядочена по id'
+        )
+        usernames = []
+        url = reverse('users-list') + '?page_size=2'
+        while url:
+            data = json.loads(self.client.get(url).content)
+            usernames.extend(user['username'] for user in data['results'])
+            url = data['next']
+        self.assertEqual(
+            usernames, [f'user{i}' for i in range(5)],
+            'Проверьте, что страницы курсора покрывают всех юзеров'
+        )
+
+    def test_page_size_capped(self):
+        with self.settings(USERS_PAGINATION={'MAX_PAGE_SIZE': 3}):
+            response = self.client.get(
+                reverse('users-list'), {'page_size': 100}
+            )
+        data = json.loads(response.content)
+        self.assertEqual(
+            len(data['results']), 3,
+            'Проверьте, что размер страницы ограничен MAX_PAGE_SIZE'
+        )
+
+    def test_keyset_query(self):
+        first = json.loads(self.client.get(
+            reverse('users-list'), {'page_size': 2}
+        ).content)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first['next'])
+        sql = queries.captured_queries[-1]['sql']
+        self.assertIn('WHERE', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_tampered_cursor(self):
+        for position in ('abc', str(2 ** 70), '-1'):
+            cursor = base64.b64encode(f'p={position}'.encode()).decode()
+            response = self.client.get(
+                reverse('users-list'), {'cursor': cursor}
+            )
+            self.assertEqual(
+                response.status_code, status.HTTP_404_NOT_FOUND,
+                'Проверьте, что подделанный курсор отклоняется'
+            )
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for i in range(3):
+            User.objects.create_user(username=f'user{i}', password='A12345a!')
+        User.objects.filter(username='user1').update(last_login=timezone.now())
+
+    def test_ndjson_matches_list(self):
+        response = self.client.get(reverse('users-export'))
+        self.assertTrue(response.streaming)
+        rows = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        listed = json.loads(self.client.get(reverse('users-list')).content)
+        self.assertEqual(
+            rows, listed,
+            'Проверьте, что экспорт совпадает со списком юзеров'
+        )
+
+    def test_json_array(self):
+        response = self.client.get(reverse('users-export'), {'output': 'json'})
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(data), 3)
+
+
+class BulkTest(TestCase):
+    def setUp(self):
+        self.client_jerry = APIClient()
+        self.client_tom = APIClient()
+        self.user_jerry = User.objects.create_user(
+            username='jerry', password='A12345a!', is_superuser=True
+        )
+        self.user_tom = User.objects.create_user(
+            username='tom', password='A12345a!', is_superuser=False
+        )
+        self.user_spike = User.objects.create_user(
+            username='spike', password='A12345a!'
+        )
+        self.client_jerry.force_authenticate(self.user_jerry)
+        self.client_tom.force_authenticate(self.user_tom)
+        self.payload = {
+            'create': [
+                {'username': 'jack', 'password': 'asfaQQWd12',
+                 'is_active': True},
+                {'username': 'jill', 'password': 'asfaQQWd12',
+                 'is_active': False},
+            ],
+            'update': [{'id': self.user_tom.pk, 'first_name': 'Thomas'}],
+            'delete': [self.user_spike.pk],
+        }
+
+    def test_bulk_not_admin(self):
+        response = self.client_tom.post(reverse('users-bulk'), self.payload)
+        self.assertEqual(
+            response.status_code, status.HTTP_403_FORBIDDEN,
+            'Проверьте, что пакетные операции доступны только админу'
+        )
+        self.assertEqual(User.objects.count(), 3)
+
+    def test_bulk_admin(self):
+        response = self.client_jerry.post(reverse('users-bulk'), self.payload)
+        data = json.loads(response.content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [user['username'] for user in data['created']], ['jack', 'jill']
+        )
+        self.assertEqual(data['deleted'], [self.user_spike.pk])
+        self.assertEqual(
+            User.objects.get(pk=self.user_tom.pk).first_name, 'Thomas'
+        )
+        self.assertFalse(User.objects.filter(username='spike').exists())
+
+    def test_bulk_errors_rollback(self):
+        self.payload['create'].append({'username': 'jack'})
+        self.payload['update'].append({'id': 0, 'first_name': 'Nobody'})
+        response = self.client_jerry.post(reverse('users-bulk'), self.payload)
+        data = json.loads(response.content)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(data['create']), {'2'})
+        self.assertEqual(set(data['update']), {'1'})
+        self.assertEqual(
+            User.objects.count(), 3,
+            'Проверьте, что при ошибках ничего не сохраняется'
+        )
+
+    def test_bulk_username_conflicts(self):
+        self.payload['update'] = [
+            {'id': self.user_tom.pk, 'username': 'jack'},
+            {'id': self.user_spike.pk, 'username': 'duke'},
+            {'id': self.user_jerry.pk, 'username': 'duke'},
+        ]
+        self.payload['delete'] = []
+        response = self.client_jerry.post(reverse('users-bulk'), self.payload)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        data = json.loads(response.content)
+        self.assertEqual(set(data['create']), {'0'})
+        self.assertEqual(
+            set(data['update']), {'0', '1', '2'},
+            'Проверьте, что совпадающие имена создаваемых и изменяемых '
+            'юзеров возвращаются ошибками по индексам'
+        )
+        self.assertEqual(
+            User.objects.get(pk=self.user_tom.pk).username, 'tom'
+        )
+
+    def test_bulk_duplicate_update_ids(self):
+        self.payload['update'] = [
+            {'id': self.user_tom.pk, 'first_name': 'Thomas'},
+            {'id': self.user_tom.pk, 'last_name': 'Cat'},
+        ]
+        response = self.client_jerry.post(reverse('users-bulk'), self.payload)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            set(json.loads(response.content)['update']), {'0', '1'},
+            'Проверьте, что повторный id в изменениях — ошибка элемента'
+        )
+        self.assertEqual(User.objects.get(pk=self.user_tom.pk).first_name, '')
+
+    def test_bulk_integrity_error(self):
+        with mock.patch.object(User.objects, 'bulk_create',
+                               side_effect=IntegrityError('unique')):
+            response = self.client_jerry.post(reverse('users-bulk'),
+                                              self.payload)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('non_field_errors', json.loads(response.content))
+        self.assertTrue(User.objects.filter(username='spike').exists())
+
+    def test_bulk_payload_not_object(self):
+        response = self.client_jerry.post(reverse('users-bulk'), [1, 2])
+        self.assertEqual(
+            response.status_code, status.HTTP_400_BAD_REQUEST,
+            'Проверьте, что тело запроса должно быть объектом'
+        )
+
+
+class PasswordTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user_jerry = User.objects.create_user(
+            username='jerry', password='A12345a!', is_superuser=True
+        )
+        self.client.force_authenticate(self.user_jerry)
+
+    def test_created_user_can_login(self):
+        self.client.post(reverse('users-list'), {
+            'username': 'jack', 'password': 'asfaQQWd12', 'is_active': True
+        })
+        self.assertNotEqual(
+            User.objects.get(username='jack').password, 'asfaQQWd12',
+            'Проверьте, что пароль сохраняется в виде хеша'
+        )
+        response = APIClient().post(reverse('token-auth'), {
+            'username': 'jack', 'password': 'asfaQQWd12'
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_common_password_rejected(self):
+        response = self.client.post(reverse('users-list'), {
+            'username': 'jack', 'password': 'password', 'is_active': True
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('password', json.loads(response.content))
+
+    def test_common_passwords_loaded_once(self):
+        self.assertIs(
+            FrozenCommonPasswordValidator().passwords,
+            FrozenCommonPasswordValidator().passwords
+        )
+
+    def test_login_upgrades_iterations(self):
+        with self.settings(PASSWORD_HASHER_COST={'PBKDF2_ITERATIONS': 1000}):
+            self.user_jerry.set_password('A12345a!')
+            self.user_jerry.save()
+        response = APIClient().post(reverse('token-auth'), {
+            'username': 'jerry', 'password': 'A12345a!'
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user_jerry.refresh_from_db()
+        self.assertNotIn('$1000$', self.user_jerry.password)
+
+
+class LastLoginTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.credentials = {'username': 'jerry', 'password': 'A12345a!'}
+        self.user_jerry = User.objects.create_user(**self.credentials)
+
+    def test_login_sets_last_login(self):
+        response = self.client.post(reverse('token-auth'), self.credentials)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user_jerry.refresh_from_db()
+        self.assertIsNotNone(self.user_jerry.last_login)
+
+    def test_login_within_granularity_skips_write(self):
+        self.client.post(reverse('token-auth'), self.credentials)
+        first = User.objects.get(pk=self.user_jerry.pk).last_login
+        with self.assertNumQueries(3):
+            self.client.post(reverse('token-auth'), self.credentials)
+        self.assertEqual(
+            User.objects.get(pk=self.user_jerry.pk).last_login, first,
+            ('Проверьте, что last_login не перезаписывается'
+             ' чаще LAST_LOGIN_GRANULARITY')
+        )
+
+    def test_login_without_granularity_writes(self):
+        self.client.post(reverse('token-auth'), self.credentials)
+        first = User.objects.get(pk=self.user_jerry.pk).last_login
+        with self.settings(LAST_LOGIN_GRANULARITY=0):
+            self.client.post(reverse('token-auth'), self.credentials)
+        self.assertGreater(
+            User.objects.get(pk=self.user_jerry.pk).last_login, first
+        )
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user_tom = User.objects.create_user(
+            username='tom', password='A12345a!'
+        )
+
+    def test_list_not_modified(self):
+        response = self.client.get(reverse('users-list'))
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('users-list'), HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(
+            response.status_code, status.HTTP_304_NOT_MODIFIED,
+            'Проверьте, что при совпадении ETag возвращается код 304'
+        )
+
+    def test_detail_not_modified_since(self):
+        response = self.client.get(
+            reverse('users-detail', args=[self.user_tom.pk])
+        )
+        response = self.client.get(
+            reverse('users-detail', args=[self.user_tom.pk]),
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_changes_on_update(self):
+        etag = self.client.get(reverse('users-list'))['ETag']
+        self.user_tom.first_name = 'Thomas'
+        self.user_tom.save()
+        response = self.client.get(
+            reverse('users-list'), HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(
+            response.status_code, status.HTTP_200_OK,
+            'Проверьте, что ETag меняется после изменения юзера'
+        )
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detail_etag_ignores_other_users(self):
+        url = reverse('users-detail', args=[self.user_tom.pk])
+        etag = self.client.get(url)['ETag']
+        User.objects.create_user(username='jerry', password='A12345a!')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(
+            response.status_code, status.HTTP_304_NOT_MODIFIED,
+            'Проверьте, что ETag юзера не зависит от изменений других юзеров'
+        )
+
+
+class ResponseCacheTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user_tom = User.objects.create_user(
+            username='tom', password='A12345a!'
+        )
+        self.token = Token.objects.create(user=self.user_tom)
+
+    def test_anonymous_read_cached(self):
+        first = self.client.get(reverse('users-list'))
+        with self.assertNumQueries(1):
+            second = self.client.get(reverse('users-list'))
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['Content-Type'], second['Content-Type'])
+
+    def test_links_follow_request_url(self):
+        User.objects.create_user(username='jerry', password='A12345a!')
+        params = {'page_size': 1}
+        self.client.get(reverse('users-list'), params)
+        response = self.client.get(reverse('users-list'), params,
+                                   secure=True)
+        self.assertTrue(
+            json.loads(response.content)['next'].startswith('https://'),
+            'Проверьте, что ссылки из кеша не берутся от другого хоста '
+            'или схемы'
+        )
+
+    def test_write_invalidates(self):
+        self.client.get(reverse('users-detail', args=[self.user_tom.pk]))
+        self.user_tom.first_name = 'Thomas'
+        self.user_tom.save()
+        response = self.client.get(
+            reverse('users-detail', args=[self.user_tom.pk])
+        )
+        self.assertEqual(
+            json.loads(response.content)['first_name'], 'Thomas',
+            'Проверьте, что кеш сбрасывается после изменения юзера'
+        )
+
+    def test_detail_survives_other_logins(self):
+        url = reverse('users-detail', args=[self.user_tom.pk])
+        first = self.client.get(url)
+        User.objects.create_user(username='jerry', password='A12345a!')
+        self.client.post(
+            reverse('token-auth'),
+            {'username': 'jerry', 'password': 'A12345a!'}
+        )
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url)
+        self.assertEqual(first.content, second.content)
+        self.assertFalse(
+            any('auth_user' in query['sql']
+                for query in queries.captured_queries),
+            'Проверьте, что вход другого юзера не сбрасывает кеш '
+            'ответа по юзеру'
+        )
+
+    def test_authenticated_not_cached(self):
+        self.client.get(reverse('users-list'))
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('users-list'))
+        self.assertTrue(any(
+            'auth_user' in query['sql'] and 'token' not in query['sql']
+            for query in queries.captured_queries
+        ))
+
+
+class FastSerializerTest(TestCase):
+    def setUp(self):
+        for i in range(3):
+            User.objects.create_user(
+                username=f'user{i}', first_name=f'Имя{i}',
+                password='A12345a!', is_superuser=bool(i % 2)
+            )
+        User.objects.filter(username='user1').update(last_login=timezone.now())
+
+    def assertSameJSON(self, fast, slow):
+        renderer = JSONRenderer()
+        self.assertEqual(
+            renderer.render(fast.data), renderer.render(slow.data)
+        )
+
+    def test_queryset_parity(self):
+        queryset = User.objects.order_by('id')
+        self.assertSameJSON(
+            FastReadOnlyUserSerializer(queryset, many=True),
+            ReadOnlyUserSerializer(queryset, many=True)
+        )
+
+    def test_instance_parity(self):
+        for user in User.objects.all():
+            self.assertSameJSON(
+                FastReadOnlyUserSerializer(user),
+                ReadOnlyUserSerializer(user)
+            )
+        users = list(User.objects.all())
+        self.assertSameJSON(
+            FastReadOnlyUserSerializer(users, many=True),
+            ReadOnlyUserSerializer(users, many=True)
+        )
+
+
+@override_settings(API_METRICS={'SAMPLE_RATE': 1.0})
+class MetricsTest(TestCase):
+    def setUp(self):
+        metrics_registry.clear()
+        self.client = APIClient()
+        self.user_jerry = User.objects.create_user(
+            username='jerry', password='A12345a!', is_superuser=True
+        )
+        self.token = Token.objects.create(user=self.user_jerry)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+    def test_metrics_exposed(self):
+        self.client.get(reverse('users-detail', args=[self.user_jerry.pk]))
+        response = self.client.get(reverse('metrics'))
+        body = response.content.decode()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        for name in ('api_request_duration_seconds', 'api_db_queries',
+                     'api_auth_duration_seconds',
+                     'api_permission_duration_seconds',
+                     'api_serializer_duration_seconds',
+                     'api_token_cache_hits_total'):
+            self.assertIn(name, body)
+        self.assertIn(
+            'api_db_queries_count{endpoint="users-detail",method="GET"} 1',
+            body
+        )
+
+    def test_unknown_method_label(self):
+        for method in ('BREW', 'PROPFIND'):
+            self.client.generic(
+                method, reverse('users-detail', args=[self.user_jerry.pk])
+            )
+        body = metrics_registry.render()
+        self.assertIn('method="other"', body)
+        self.assertNotIn('BREW', body,
+                         'Проверьте, что метод запроса не попадает в метки')
+
+    def test_metrics_admin_only(self):
+        self.user_jerry.is_superuser = False
+        self.user_jerry.save()
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_sampling_disabled(self):
+        with self.settings(API_METRICS={'SAMPLE_RATE': 0}):
+            self.client.get(reverse('users-list'))
+        self.assertNotIn(
+            'endpoint="users-list"', metrics_registry.render()
+        )
+
+
+class AsgiTest(TestCase):
+    def setUp(self):
+        self.application = WsgiToAsgi(get_wsgi_application(), max_workers=2)
+
+    def tearDown(self):
+        self.application.executor.shutdown()
+
+    def request(self, method, path, body=b'', headers=()):
+        scope = {
+            'type': 'http', 'http_version': '1.1', 'method': method,
+            'scheme': 'http', 'path': path, 'query_string': b'',
+            'headers': [(b'host', b'testserver')] + list(headers),
+        }
+        messages = [
+            {'type': 'http.request', 'body': body[:5], 'more_body': True},
+            {'type': 'http.request', 'body': body[5:]},
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.application(scope, receive, send))
+        return sent[0]['status'], b''.join(
+            message.get('body', b'') for message in sent[1:]
+        )
+
+    def test_get(self):
+        status_code, body = self.request('GET', reverse('users-list'))
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertIsInstance(json.loads(body), list)
+
+    def test_post_body(self):
+        status_code, body = self.request(
+            'POST', reverse('token-auth'),
+            body=json.dumps({'username': 'nobody', 'password': 'x'}).encode(),
+            headers=[(b'content-type', b'application/json')]
+        )
+        self.assertEqual(status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('non_field_errors', json.loads(body))
+
+    def test_body_too_large(self):
+        self.application = WsgiToAsgi(get_wsgi_application(), max_workers=1,
+                                      max_body_size=8)
+        status_code, body = self.request('POST', reverse('token-auth'),
+                                         body=b'x' * 9)
+        self.assertEqual(
+            status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            'Проверьте, что тело запроса ограничено по размеру'
+        )
+        status_code, body = self.request(
+            'POST', reverse('token-auth'),
+            headers=[(b'content-length', b'100000')]
+        )
+        self.assertEqual(status_code,
+                         status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+
+class AsgiExportTest(TransactionTestCase):
+    """
+    The worker threads use their own connections, so the users have to
+    be committed
+    """
+
+    setUp = AsgiTest.setUp
+    tearDown = AsgiTest.tearDown
+    request = AsgiTest.request
+
+    def test_streamed_export_on_one_thread(self):
+        User.objects.bulk_create(
+            User(username=f'user{i}') for i in range(25)
+        )
+        threads = set()
+        iter_rows = FastReadOnlyUserSerializer.iter_rows
+
+        def recording_rows(*args, **kwargs):
+            for row in iter_rows(*args, **kwargs):
+                threads.add(threading.get_ident())
+                yield row
+
+        def finished(**kwargs):
+            threads.add(threading.get_ident())
+
+        request_finished.connect(finished)
+        self.addCleanup(request_finished.disconnect, finished)
+        with mock.patch.object(FastReadOnlyUserSerializer, 'iter_rows',
+                               recording_rows), \
+                mock.patch('api_users.views.UserViewSet.export_chunk_size',
+                           2):
+            status_code, body = self.request('GET', reverse('users-export'))
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(len(body.splitlines()), 25)
+        self.assertEqual(
+            len(threads), 1,
+            'Проверьте, что выгрузка читается и закрывается в одном потоке'
+        )
+
+
+class TokenExpiryTest(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.client = APIClient()
+        self.credentials = {'username': 'tom', 'password': 'A12345a!'}
+        self.user_tom = User.objects.create_user(**self.credentials)
+        self.token = Token.objects.create(user=self.user_tom)
+
+    def age_token(self, token, days):
+        Token.objects.filter(key=token.key).update(
+            created=timezone.now() - timedelta(days=days)
+        )
+
+    def test_expired_token_rejected(self):
+        self.age_token(self.token, 31)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        response = self.client.delete(reverse('users-detail', args=[0]))
+        self.assertEqual(
+            response.status_code, status.HTTP_401_UNAUTHORIZED,
+            'Проверьте, что просроченный токен не принимается'
+        )
+
+    def test_login_reissues_expired_token(self):
+        self.age_token(self.token, 31)
+        response = self.client.post(reverse('token-auth'), self.credentials)
+        key = json.loads(response.content)['token']
+        self.assertNotEqual(key, self.token.key)
+        self.assertFalse(Token.objects.filter(key=self.token.key).exists())
+
+    def test_rotate_on_login(self):
+        with self.settings(TOKEN_EXPIRY={'ROTATE_ON_LOGIN': True}):
+            response = self.client.post(
+                reverse('token-auth'), self.credentials
+            )
+        self.assertNotEqual(
+            json.loads(response.content)['token'], self.token.key
+        )
+
+    def test_concurrent_rotation(self):
+        delete = Token.delete
+
+        def delete_and_race(token):
+            delete(token)
+            # The other login creates its token first
+            Token.objects.create(user=self.user_tom)
+
+        with self.settings(TOKEN_EXPIRY={'ROTATE_ON_LOGIN': True}), \
+                mock.patch.object(Token, 'delete', delete_and_race):
+            response = self.client.post(
+                reverse('token-auth'), self.credentials
+            )
+        self.assertEqual(
+            response.status_code, status.HTTP_200_OK,
+            'Проверьте, что одновременный вход не приводит к ошибке'
+        )
+        self.assertEqual(json.loads(response.content)['token'],
+                         Token.objects.get(user=self.user_tom).key)
+
+    def test_usage_flushed_in_batches(self):
+        buffer = TokenUsageBuffer(interval=3600)
+        buffer.touch(self.token.key)
+        buffer.touch(self.token.key)
+        self.assertFalse(TokenActivity.objects.exists())
+        with self.assertNumQueries(3):
+            buffer.flush()
+        self.assertTrue(
+            TokenActivity.objects.filter(token=self.token).exists()
+        )
+
+    def test_exit_flush_only_to_same_database(self):
+        buffer = TokenUsageBuffer(interval=3600)
+        with self.assertNumQueries(0):
+            buffer.flush_at_exit()
+        buffer.touch(self.token.key)
+        with mock.patch.object(TokenUsageBuffer, '_database_name',
+                               return_value='db.sqlite3'), \
+                self.assertNumQueries(0):
+            buffer.flush_at_exit()
+        buffer.flush_at_exit()
+        self.assertTrue(
+            TokenActivity.objects.filter(token=self.token).exists(),
+            'Проверьте, что при выходе использование токенов дописывается '
+            'в ту же базу'
+        )
+
+    def test_purge(self):
+        fresh = Token.objects.create(
+            user=User.objects.create_user(username='jerry')
+        )
+        self.age_token(self.token, 31)
+        call_command('purge_tokens', chunk_size=1, pause=0, stdout=StringIO())
+        self.assertEqual(
+            list(Token.objects.values_list('key', flat=True)), [fresh.key]
+        )
+
+    def test_purge_uses_indexes(self):
+        options = {'MAX_AGE': 3600, 'IDLE_TIMEOUT': 600}
+        with self.settings(TOKEN_EXPIRY=options):
+            sources = PurgeTokensCommand().expired(timezone.now())
+        self.assertEqual(len(sources), 3)
+        for source in sources:
+            plan = source[:1000].explain()
+            self.assertNotIn(
+                'SCAN', plan,
+                'Проверьте, что очистка токенов не сканирует таблицу'
+            )
+
+
+class ReplicaRoutingTest(TestCase):
+    """
+    Reads of safe-method requests go to a second local SQLite database
+    """
+
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        handle, cls.replica_path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connections.databases['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': cls.replica_path,
+        }
+        connections.ensure_defaults('replica')
+        call_command('migrate', database='replica', verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.databases['replica']
+        os.remove(cls.replica_path)
+
+    def setUp(self):
+        token_cache.clear()
+        self.client = APIClient()
+        self.user_tom = User.objects.create_user(
+            username='tom', password='A12345a!'
+        )
+        self.token = Token.objects.create(user=self.user_tom)
+        User.objects.db_manager('replica').create_user(
+            username='replica_only', password='A12345a!'
+        )
+
+    def test_safe_requests_read_replica(self):
+        with self.settings(DATABASE_REPLICAS=['replica']):
+            response = self.client.get(reverse('users-list'))
+        self.assertEqual(
+            [user['username'] for user in json.loads(response.content)],
+            ['replica_only'],
+            'Проверьте, что GET-запросы читают из реплики'
+        )
+
+    def test_writes_use_default(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        with self.settings(DATABASE_REPLICAS=['replica']):
+            response = self.client.patch(
+                reverse('users-detail', args=[self.user_tom.pk]),
+                {'first_name': 'Thomas'}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            User.objects.using('default').get(username='tom').first_name,
+            'Thomas'
+        )
+
+    def test_without_replicas_reads_default(self):
+        response = self.client.get(reverse('users-list'))
+        self.assertEqual(
+            [user['username'] for user in json.loads(response.content)],
+            ['tom']
+        )
+
+
+class FilterTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        now = timezone.now()
+        for i, name in enumerate(['john', 'johanna', 'joe', 'jack']):
+            User.objects.create_user(
+                username=name, password='A12345a!', is_active=bool(i % 2)
+            )
+        User.objects.filter(username='john').update(
+            last_login=now - timedelta(days=10)
+        )
+        User.objects.filter(username='joe').update(last_login=now)
+
+    def usernames(self, params):
+        response = self.client.get(reverse('users-list'), params)
+        return sorted(
+            user['username'] for user in json.loads(response.content)
+        )
+
+    def test_prefix_ending_with_last_code_point(self):
+        User.objects.create_user(username='jo\U0010ffffe')
+        self.assertEqual(
+            self.usernames({'username_prefix': 'jo\U0010ffff'}),
+            ['jo\U0010ffffe'],
+            'Проверьте поиск по префиксу с последним символом Unicode'
+        )
+        self.assertEqual(self.usernames({'username_prefix': '\U0010ffff'}),
+                         [])
+        User.objects.create_user(username='\ud7ffe')
+        self.assertEqual(self.usernames({'username_prefix': '\ud7ff'}),
+                         ['\ud7ffe'])
+
+    def test_filters(self):
+        self.assertEqual(self.usernames({'username': 'joe'}), ['joe'])
+        self.assertEqual(
+            self.usernames({'username_prefix': 'joh'}), ['johanna', 'john']
+        )
+        self.assertEqual(
+            self.usernames({'is_active': 'true'}), ['jack', 'johanna']
+        )
+        self.assertEqual(
+            self.usernames({'last_login_after': (
+                timezone.now() - timedelta(days=1)).isoformat()}),
+            ['joe']
+        )
+        self.assertEqual(
+            self.usernames({
+                'last_login_before': timezone.now().isoformat(),
+                'username_prefix': 'jo',
+            }),
+            ['joe', 'john']
+        )
+
+    def test_invalid_filter(self):
+        response = self.client.get(
+            reverse('users-list'), {'last_login_after': 'yesterday'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('last_login_after', json.loads(response.content))
+
+    def test_filters_use_indexes(self):
+        backend = UserFilterBackend()
+        for params in ({'username': 'joe'}, {'username_prefix': 'jo'},
+                       {'is_active': 'true'},
+                       {'last_login_after': timezone.now().isoformat()},
+                       {'is_active': 'false',
+                        'last_login_before': timezone.now().isoformat()}):
+            request = Request(APIRequestFactory().get('/', params))
+            queryset = backend.filter_queryset(
+                request, User.objects.all(), None
+            )
+            sql, sql_params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, sql_params)
+                plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+            self.assertIn('USING', plan, f'{params}: {plan}')
+            self.assertNotIn('SCAN', plan, f'{params}: {plan}')
+
+
+class SparseFieldsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user_tom = User.objects.create_user(
+            username='tom', email='tom@disney.com', password='A12345a!'
+        )
+
+    def test_list_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('users-list'), {'fields': 'id,username'}
+            )
+        self.assertEqual(
+            json.loads(response.content),
+            [{'id': self.user_tom.pk, 'username': 'tom'}]
+        )
+        sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('password', sql)
+        self.assertNotIn('email', sql)
+
+    def test_paginated_and_retrieve_fields(self):
+        response = self.client.get(
+            reverse('users-list'), {'fields': 'username', 'page_size': 10}
+        )
+        self.assertEqual(
+            json.loads(response.content)['results'], [{'username': 'tom'}]
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('users-detail', args=[self.user_tom.pk]),
+                {'fields': 'username,last_login'}
+            )
+        self.assertEqual(
+            json.loads(response.content),
+            {'username': 'tom', 'last_login': None}
+        )
+        self.assertNotIn('password', queries.captured_queries[-1]['sql'])
+
+    def test_unknown_field(self):
+        response = self.client.get(
+            reverse('users-list'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', json.loads(response.content))
+
+    def test_empty_fields(self):
+        for fields in (',', ' , '):
+            response = self.client.get(
+                reverse('users-list'), {'fields': fields}
+            )
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST,
+                'Проверьте, что пустой список полей отклоняется'
+            )
+            self.assertIn('fields', json.loads(response.content))
+
+
+@override_settings(REST_FRAMEWORK=dict(
+    settings.REST_FRAMEWORK,
+    DEFAULT_THROTTLE_RATES={'login': '2/min', 'user_write': '2/min'},
+))
+class ThrottleTest(TestCase):
+    def setUp(self):
+        counter_store().clear()
+        self.addCleanup(counter_store().clear)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='jerry', password='A12345a!'
+        )
+        self.token = Token.objects.create(user=self.user)
+
+    def test_login_throttled(self):
+        data = {'username': 'jerry', 'password': 'wrong'}
+        for _ in range(2):
+            response = self.client.post(reverse('token-auth'), data)
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+        response = self.client.post(reverse('token-auth'), data)
+        self.assertEqual(
+            response.status_code, status.HTTP_429_TOO_MANY_REQUESTS,
+            'Проверьте, что частые попытки входа ограничиваются'
+        )
+        self.assertIn('Retry-After', response)
+
+    def test_login_throttled_despite_forwarded_for(self):
+        data = {'username': 'jerry', 'password': 'wrong'}
+        codes = [
+            self.client.post(reverse('token-auth'), data,
+                             HTTP_X_FORWARDED_FOR=f'10.0.0.{i}').status_code
+            for i in range(3)
+        ]
+        self.assertEqual(
+            codes[-1], status.HTTP_429_TOO_MANY_REQUESTS,
+            'Проверьте, что подмена X-Forwarded-For не обходит ограничение'
+        )
+
+    def test_writes_throttled_reads_not(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        url = reverse('users-detail', args=[self.user.pk])
+        for _ in range(2):
+            response = self.client.patch(url, {'first_name': 'Jerry'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.patch(url, {'first_name': 'Jerry'})
+        self.assertEqual(
+            response.status_code, status.HTTP_429_TOO_MANY_REQUESTS,
+            'Проверьте, что частые изменения пользователей ограничиваются'
+        )
+        for _ in range(3):
+            response = self.client.get(url)
+            self.assertEqual(
+                response.status_code, status.HTTP_200_OK,
+                'Проверьте, что чтение не ограничивается'
+            )
+
+    def test_sqlite_store_shared(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'throttle.sqlite3')
+            first, second = SQLiteCounterStore(path), SQLiteCounterStore(path)
+            now = 120.0
+            self.assertEqual(first.hit('login:a', 60, 2, now), (True, None))
+            self.assertEqual(second.hit('login:a', 60, 2, now), (True, None))
+            allowed, wait = first.hit('login:a', 60, 2, now)
+            self.assertFalse(allowed)
+            self.assertEqual(wait, 60)
+            self.assertEqual(second.hit('login:b', 60, 2, now), (True, None))
+            # Half of the previous window still counts
+            self.assertEqual(
+                second.hit('login:a', 60, 2, now + 90), (True, None)
+            )
+            self.assertFalse(second.hit('login:a', 60, 2, now + 90)[0])
+            first.connection.close()
+            second.connection.close()
+
+
+class ApiProfileTest(TestCase):
+    def setUp(self):
+        with mock.patch.dict(os.environ, {'DJANGO_SECRET_KEY': 'test'}):
+            self.profile = importlib.import_module(
+                'test_assignment.settings_api'
+            )
+        self.user = User.objects.create_user(
+            username='jerry', password='A12345a!'
+        )
+        self.client = APIClient()
+
+    def test_lean_stack(self):
+        self.assertNotIn('django.contrib.admin', self.profile.INSTALLED_APPS)
+        self.assertNotIn(
+            'django.contrib.sessions.middleware.SessionMiddleware',
+            self.profile.MIDDLEWARE
+        )
+
+    def test_shared_token_cache(self):
+        backend = self.profile.TOKEN_CACHE['BACKEND']
+        self.assertIn(backend, self.profile.CACHES,
+                      'Общий кеш токенов не настроен')
+        self.assertNotIn(
+            'locmem', self.profile.CACHES[backend]['BACKEND'],
+            'Кеш в памяти процесса не общий для воркеров'
+        )
+
+    def test_api_works(self):
+        with override_settings(
+            MIDDLEWARE=self.profile.MIDDLEWARE,
+            TEMPLATES=self.profile.TEMPLATES,
+            USE_I18N=self.profile.USE_I18N,
+            REST_FRAMEWORK=self.profile.REST_FRAMEWORK,
+        ):
+            response = self.client.post(
+                reverse('token-auth'),
+                {'username': 'jerry', 'password': 'A12345a!'}
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.client.credentials(
+                HTTP_AUTHORIZATION='Token ' + response.data['token']
+            )
+            url = reverse('users-detail', args=[self.user.pk])
+            response = self.client.patch(url, {'first_name': 'Jerry'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = self.client.get(reverse('users-list'))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response['Content-Type'], 'application/json')
+            self.assertNotIn('X-Frame-Options', response)
+            self.assertFalse(response.cookies)
+            response = self.client.get(
+                reverse('users-detail', args=[self.user.pk + 100])
+            )
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class FastJSONTest(TestCase):
+    data = {
+        'next': None,
+        'results': ReturnList([
+            ReturnDict({
+                'id': 1, 'username': 'Джерри \u2028',
+                'last_login': datetime.datetime(
+                    2020, 1, 2, 3, 4, 5, 6, tzinfo=datetime.timezone.utc
+                ),
+            }, serializer=None),
+            {'joined': datetime.date(2020, 1, 2), 'rate': Decimal('1.5'),
+             'tags': ('a', 'b'), 1: 'key', 'big': 2 ** 70},
+        ], serializer=None),
+    }
+
+    def test_render_parity(self):
+        self.assertEqual(
+            FastJSONRenderer().render(self.data),
+            JSONRenderer().render(self.data),
+            'Проверьте, что быстрый рендерер выдаёт те же байты'
+        )
+        with mock.patch('api_users.renderers.orjson', None):
+            self.assertEqual(
+                FastJSONRenderer().render(self.data),
+                JSONRenderer().render(self.data),
+                'Проверьте, что без orjson используется модуль json'
+            )
+        self.assertEqual(
+            FastJSONRenderer().render(
+                self.data, 'application/json; indent=4'
+            ),
+            JSONRenderer().render(self.data, 'application/json; indent=4')
+        )
+
+    def test_parse_parity(self):
+        body = JSONRenderer().render(self.data)
+        self.assertEqual(
+            FastJSONParser().parse(BytesIO(body)),
+            JSONParser().parse(BytesIO(body))
+        )
+        for body in (b'{"a": ', b'{"a": NaN}'):
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(BytesIO(body))
+
+    def test_api_parity(self):
+        user = User.objects.create_user(
+            username='jerry', first_name='Джерри', password='A12345a!'
+        )
+        User.objects.filter(pk=user.pk).update(last_login=timezone.now())
+        response = self.client.get(reverse('users-list'))
+        self.assertIsInstance(response.data[0]['last_login'],
+                              datetime.datetime)
+        self.assertEqual(
+            response.content,
+            JSONRenderer().render(
+                ReadOnlyUserSerializer(User.objects.all(), many=True).data
+            ),
+            'Проверьте, что ответ API не изменился'
+        )
+        response = self.client.get(reverse('users-list'),
+                                   HTTP_ACCEPT='text/html')
+        self.assertIn('Джерри', response.content.decode())
+
+
+@unittest.skipIf(msgpack is None, 'msgpack is not installed')
+class MessagePackTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            username='admin', password='A12345a!', is_superuser=True
+        )
+        User.objects.filter(pk=self.admin.pk).update(
+            last_login=timezone.now()
+        )
+        User.objects.create_user(username='jerry', first_name='Джерри')
+
+    def test_list_formats(self):
+        url = reverse('users-list')
+        expected = self.client.get(url).json()
+        response = self.client.get(url, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(
+            msgpack.unpackb(response.content), expected,
+            'Проверьте, что MessagePack содержит те же данные, что и JSON'
+        )
+        response = self.client.get(url, {'format': 'columnar'})
+        table = msgpack.unpackb(response.content)
+        self.assertEqual(table['columns'], list(expected[0]),
+                         'Проверьте, что имена полей записаны один раз')
+        self.assertEqual(
+            [dict(zip(table['columns'], row)) for row in table['rows']],
+            expected
+        )
+        columnar = ColumnarMessagePackRenderer.media_type
+        response = self.client.get(url, {'page_size': 1},
+                                   HTTP_ACCEPT=columnar)
+        page = msgpack.unpackb(response.content)
+        self.assertIsNotNone(page['next'])
+        self.assertEqual(len(page['results']['rows']), 1)
+
+    def test_write_and_login(self):
+        response = self.client.post(
+            reverse('token-auth'),
+            msgpack.packb({'username': 'admin', 'password': 'A12345a!'}),
+            content_type='application/msgpack',
+            HTTP_ACCEPT='application/msgpack',
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        token = msgpack.unpackb(response.content)['token']
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token)
+        response = self.client.post(
+            reverse('users-list'),
+            msgpack.packb({'username': 'tom', 'password': 'A12345a!x',
+                           'is_active': True}),
+            content_type='application/msgpack',
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED,
+                         'Проверьте разбор тела запроса в MessagePack')
+        self.assertTrue(User.objects.filter(username='tom').exists())
+        response = self.client.post(
+            reverse('users-list'), b'\xc1', content_type='application/msgpack'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_without_msgpack(self):
+        with mock.patch.object(MessagePackRenderer, 'available', False), \
+                mock.patch.object(ColumnarMessagePackRenderer, 'available',
+                                  False), \
+                mock.patch.object(MessagePackParser, 'available', False):
+            response = self.client.get(reverse('users-list'),
+                                       HTTP_ACCEPT='application/msgpack')
+            self.assertEqual(response.status_code,
+                             status.HTTP_406_NOT_ACCEPTABLE)
+            response = self.client.post(
+                reverse('token-auth'), msgpack.packb({'username': 'admin'}),
+                content_type='application/msgpack',
+            )
+            self.assertEqual(response.status_code,
+                             status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+
+class PermissionQueriesTest(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.client = APIClient()
+        self.user_tom = User.objects.create_user(
+            username='tom', first_name='Tom', password='A12345a!'
+        )
+        self.user_jerry = User.objects.create_user(
+            username='jerry', password='A12345a!'
+        )
+        self.admin = User.objects.create_user(
+            username='admin', password='A12345a!', is_superuser=True
+        )
+        self.token = Token.objects.create(user=self.user_tom)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        # Warm the token cache
+        self.client.get(reverse('users-detail', args=[self.user_tom.pk]))
+
+    def test_foreign_id_refused_without_queries(self):
+        url = reverse('users-detail', args=[self.user_jerry.pk])
+        for method in ('patch', 'put', 'delete'):
+            with self.assertNumQueries(0):
+                response = getattr(self.client, method)(url, {})
+            self.assertEqual(
+                response.status_code, status.HTTP_403_FORBIDDEN,
+                ('Проверьте, что чужой id отклоняется до загрузки'
+                 ' пользователя')
+            )
+
+    def test_own_partial_update_single_update(self):
+        url = reverse('users-detail', args=[self.user_tom.pk])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(url, {'last_name': 'Cat'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['first_name'], 'Tom')
+        self.assertEqual(response.data['last_name'], 'Cat')
+        user_queries = [
+            query['sql'] for query in queries.captured_queries
+            if '"auth_user"' in query['sql']
+        ]
+        self.assertEqual(
+            len(user_queries), 1,
+            'Проверьте, что изменение своего профиля — один UPDATE'
+        )
+        self.assertTrue(user_queries[0].startswith('UPDATE'))
+        self.assertNotIn('"password"', user_queries[0])
+        self.assertEqual(
+            User.objects.get(pk=self.user_tom.pk).last_name, 'Cat'
+        )
+
+    def test_own_delete_skips_select(self):
+        url = reverse('users-detail', args=[self.user_tom.pk])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(any(
+            query['sql'].startswith('SELECT "auth_user"')
+            for query in queries.captured_queries
+        ))
+        self.assertFalse(User.objects.filter(pk=self.user_tom.pk).exists())
+
+    def test_admin_update_writes_submitted_columns(self):
+        token = Token.objects.create(user=self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        User.objects.filter(pk=self.user_jerry.pk).update(last_name='Mouse')
+        response = self.client.patch(
+            reverse('users-detail', args=[self.user_jerry.pk]),
+            {'first_name': 'Jerry'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        jerry = User.objects.get(pk=self.user_jerry.pk)
+        self.assertEqual(
+            (jerry.first_name, jerry.last_name), ('Jerry', 'Mouse')
+        )
+        response = self.client.patch(
+            reverse('users-detail', args=[0]), {'first_name': 'Nobody'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(STATELESS_TOKENS={'ENABLED': True, 'REFRESH_INTERVAL': 5})
+class SignedTokenTest(TestCase):
+    def setUp(self):
+        revocations.clear()
+        self.client = APIClient()
+        self.password = 'A12345a!'
+        self.user = User.objects.create_user(
+            username='jerry', first_name='Jerry', password=self.password
+        )
+
+    def login(self):
+        response = APIClient().post(reverse('token-auth'), {
+            'username': 'jerry', 'password': self.password
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['token']
+
+    def authenticate(self, key):
+        request = APIRequestFactory().get(
+            '/', HTTP_AUTHORIZATION='Token ' + key
+        )
+        return SignedTokenAuthentication().authenticate(Request(request))
+
+    def test_malformed_keys_rejected(self):
+        url = reverse('users-detail', args=[self.user.pk])
+        # UTF-8 bytes of the header as WSGI passes them
+        for key in ('1.2.3.4.' + 'é'.encode().decode('latin-1'),
+                    'a.b.c.d.e', '1.2.3.4.'):
+            self.client.credentials(HTTP_AUTHORIZATION='Token ' + key)
+            response = self.client.patch(url, {'first_name': 'Tom'})
+            self.assertEqual(
+                response.status_code, status.HTTP_401_UNAUTHORIZED,
+                'Проверьте, что испорченный токен отклоняется без ошибки '
+                'сервера'
+            )
+
+    def test_login_issues_signed_token(self):
+        key = self.login()
+        self.assertEqual(key.count('.'), 4)
+        self.assertFalse(Token.objects.exists())
+        self.authenticate(key)
+        with self.assertNumQueries(0):
+            user, token = self.authenticate(key)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertFalse(user.is_superuser)
+        self.assertEqual(token.user_id, self.user.pk)
+
+    def test_api_with_signed_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.login())
+        response = self.client.patch(
+            reverse('users-detail', args=[self.user.pk]),
+            {'last_name': 'Mouse'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['first_name'], 'Jerry')
+        self.assertEqual(response.data['last_name'], 'Mouse')
+        # Profile changes and logins do not revoke the token
+        self.login()
+        response = self.client.patch(
+            reverse('users-detail', args=[self.user.pk]),
+            {'first_name': 'Jerry'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_tampered_and_disabled(self):
+        key = self.login()
+        payload, signature = key.rsplit('.', 1)
+        user_id, rest = payload.split('.', 1)
+        forged = f'{int(user_id) + 1}.{rest}.{signature}'
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + forged)
+        response = self.client.patch(
+            reverse('users-detail', args=[self.user.pk + 1]), {}
+        )
+        self.assertEqual(response.status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        with override_settings(STATELESS_TOKENS={'ENABLED': False}):
+            self.client.credentials(HTTP_AUTHORIZATION='Token ' + key)
+            response = self.client.patch(
+                reverse('users-detail', args=[self.user.pk]), {}
+            )
+        self.assertEqual(
+            response.status_code, status.HTTP_401_UNAUTHORIZED,
+            'Проверьте, что без STATELESS_TOKENS подписанный токен не принят'
+        )
+
+    def test_expired(self):
+        key = issue(self.user, now=1)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + key)
+        response = self.client.patch(
+            reverse('users-detail', args=[self.user.pk]), {}
+        )
+        self.assertEqual(response.status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoked_on_password_change(self):
+        key = self.login()
+        self.user.set_password('B12345b!')
+        self.user.save()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + key)
+        response = self.client.patch(
+            reverse('users-detail', args=[self.user.pk]), {}
+        )
+        self.assertEqual(
+            response.status_code, status.HTTP_401_UNAUTHORIZED,
+            'Проверьте, что смена пароля отзывает подписанные токены'
+        )
+        self.password = 'B12345b!'
+        self.assertIsNotNone(self.authenticate(self.login()))
+
+    def test_incremental_refresh(self):
+        versions = RevocationMap(interval=0)
+        self.assertEqual(versions.version(self.user.pk), 0)
+        TokenRevocation.objects.revoke([self.user.pk])
+        self.assertEqual(versions.version(self.user.pk), 1)
+        TokenRevocation.objects.revoke([self.user.pk])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(versions.version(self.user.pk), 2)
+        self.assertIn('"modified" >=', queries.captured_queries[0]['sql'])
+
+
+class SlowSink:
+    def __init__(self, delay):
+        self.delay = delay
+        self.events = []
+
+    def write(self, events):
+        time.sleep(self.delay)
+        self.events.extend(events)
+
+
+class AuditTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            username='admin', password='A12345a!', is_superuser=True
+        )
+        self.token = Token.objects.create(user=self.admin)
+
+    def test_api_events(self):
+        options = {'ENABLED': True, 'WORKER': False, 'BATCH_SIZE': 1}
+        with override_settings(AUDIT_LOG=options):
+            self.client.post(reverse('token-auth'), {
+                'username': 'admin', 'password': 'A12345a!'
+            })
+            self.client.credentials(
+                HTTP_AUTHORIZATION='Token ' + self.token.key
+            )
+            response = self.client.post(reverse('users-list'), {
+                'username': 'jerry', 'password': 'A12345a!x',
+                'is_active': True,
+            })
+            pk = response.data['id']
+            url = reverse('users-detail', args=[pk])
+            self.client.patch(url, {'first_name': 'Jerry'})
+            self.client.delete(url)
+        events = list(AuditEvent.objects.order_by('id').values_list(
+            'action', 'user_id', 'actor_id', 'fields'
+        ))
+        self.assertEqual(events, [
+            (AuditEvent.LOGIN, self.admin.pk, self.admin.pk, ''),
+            (AuditEvent.CREATE, pk, self.admin.pk,
+             'username,password,is_active'),
+            (AuditEvent.UPDATE, pk, self.admin.pk, 'first_name'),
+            (AuditEvent.DELETE, pk, self.admin.pk, ''),
+        ], 'Проверьте, что изменения пользователей попадают в журнал')
+
+    def test_request_does_not_wait_for_sink(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'audit.ndjson')
+            options = {'ENABLED': True, 'BACKEND': 'ndjson', 'PATH': path,
+                       'INTERVAL': 0.05}
+            self.client.credentials(
+                HTTP_AUTHORIZATION='Token ' + self.token.key
+            )
+            url = reverse('users-detail', args=[self.admin.pk])
+            with override_settings(AUDIT_LOG=options), \
+                    mock.patch.object(NDJSONSink, 'write', side_effect=(
+                        lambda events: time.sleep(0.5))) as write:
+                start = time.perf_counter()
+                response = self.client.patch(url, {'first_name': 'A'})
+                elapsed = time.perf_counter() - start
+                log = audit_log()
+                log.close()
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLess(
+                elapsed, 0.5,
+                'Проверьте, что запрос не ждёт записи журнала'
+            )
+            self.assertEqual(write.call_count, 1)
+            self.assertEqual(log.stats()['written'], 1)
+
+    def test_record_latency_with_slow_sink(self):
+        sink = SlowSink(delay=0.05)
+        log = AuditLog(sink, batch_size=100, interval=0.05)
+        start = time.perf_counter()
+        for i in range(1000):
+            log.record({'user_id': i})
+        elapsed = time.perf_counter() - start
+        self.assertLess(elapsed / 1000, 0.0005,
+                        'Проверьте, что постановка в очередь дешёвая')
+        log.close()
+        self.assertEqual(len(sink.events), 1000,
+                         'Проверьте, что close() дописывает очередь')
+
+    def test_bounded_queue(self):
+        sink = SlowSink(delay=0)
+        log = AuditLog(sink, batch_size=100, interval=60, max_size=10,
+                       worker=False)
+        results = [log.record({'user_id': i}) for i in range(15)]
+        self.assertEqual(results.count(False), 5)
+        self.assertEqual(log.stats()['dropped'], 5)
+        log = AuditLog(sink, batch_size=100, interval=60, max_size=1,
+                       policy='block', block_timeout=0.01, worker=False)
+        log.record({'user_id': 1})
+        self.assertFalse(log.record({'user_id': 2}))
+        log.close()
+        self.assertEqual(log.stats()['written'], 1)
+
+    def test_ndjson_rotation(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'audit.ndjson')
+            sink = NDJSONSink(path, max_bytes=100, backup_count=2)
+            for i in range(10):
+                sink.write([{'action': 'login', 'user_id': i,
+                             'created': timezone.now()}])
+            self.assertEqual(
+                sorted(os.listdir(directory)),
+                ['audit.ndjson', 'audit.ndjson.1', 'audit.ndjson.2']
+            )
+            with open(path) as stream:
+                self.assertEqual(json.loads(stream.readline())['user_id'],
+                                 9)
+
+
+class ChangeFeedTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            username='admin', password='A12345a!', is_superuser=True
+        )
+        self.token = Token.objects.create(user=self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.url = reverse('users-changes')
+
+    def feed(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_deltas_and_tombstones(self):
+        cursor = self.feed()['cursor']
+        tom = User.objects.create_user(username='tom', password='A12345a!')
+        jerry = User.objects.create_user(username='jerry',
+                                         password='A12345a!')
+        url = reverse('users-detail', args=[tom.pk])
+        self.client.patch(url, {'first_name': 'Tom'})
+        self.client.delete(reverse('users-detail', args=[jerry.pk]))
+        data = self.feed(since=cursor, fields='id,first_name')
+        results = data['results']
+        self.assertEqual(
+            [(item['id'], item['deleted']) for item in results],
+            [(tom.pk, False), (jerry.pk, True)],
+            'Проверьте, что в ленте только последние изменения '
+            'пользователей по порядку'
+        )
+        self.assertEqual(results[0]['user'],
+                         {'id': tom.pk, 'first_name': 'Tom'})
+        self.assertNotIn('user', results[1],
+                         'Проверьте, что удаление отдаётся без данных')
+        self.assertEqual(data['cursor'], results[-1]['seq'])
+        self.assertEqual(self.feed(since=data['cursor'])['results'], [],
+                         'Проверьте, что курсор отсекает старые изменения')
+
+    def test_limit(self):
+        User.objects.bulk_create(
+            User(username=f'user{i}') for i in range(3)
+        )
+        # bulk_create() sends no signals
+        UserChange.objects.record(User.objects.filter(
+            username__startswith='user').values_list('pk', flat=True))
+        cursor = UserChange.objects.get(user_id=self.admin.pk).seq
+        data = self.feed(since=cursor, limit=2)
+        self.assertEqual(len(data['results']), 2)
+        self.assertTrue(data['has_more'])
+        data = self.feed(since=data['cursor'], limit=2)
+        self.assertEqual(len(data['results']), 1)
+        self.assertFalse(data['has_more'],
+                         'Проверьте признак следующей страницы')
+
+    def test_repeated_ids(self):
+        users_changed.send(sender=User, pks=[self.admin.pk, self.admin.pk])
+        self.assertEqual(
+            UserChange.objects.filter(user_id=self.admin.pk).count(), 1,
+            'Проверьте, что повторные id записываются один раз'
+        )
+
+    def test_queries(self):
+        User.objects.create_user(username='tom', password='A12345a!')
+        self.feed()
+        with self.assertNumQueries(2):
+            self.feed(fields='id,username')
+
+    def test_invalid_since(self):
+        for value in ('-1', 'abc', str(2 ** 70)):
+            response = self.client.get(self.url, {'since': value})
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+            self.assertIn('since', response.json())
+
+
+class QueryBudgetTest(TestCase):
+    """
+    Upper bounds on the queries and the time (rendering included) of
+    every users API action and login for each kind of client, so an
+    extra query or a slow path fails here with the SQL that ran.
+    Authenticated clients are measured with a warm token cache
+    """
+
+    kinds = ('anonymous', 'user', 'superuser')
+    list_sizes = (10, 100, 1000)
+    password = 'A12345a!'
+
+    # (action, client kind): (status, queries). List budgets hold for
+    # every table size
+    budgets = {
+        ('list', 'anonymous'): (200, 2),
+        ('list', 'user'): (200, 2),
+        ('list', 'superuser'): (200, 2),
+        ('retrieve', 'anonymous'): (200, 2),
+        ('retrieve', 'user'): (200, 2),
+        ('retrieve', 'superuser'): (200, 2),
+        ('create', 'anonymous'): (401, 0),
+        ('create', 'user'): (403, 0),
+        ('create', 'superuser'): (201, 7),
+        ('update', 'anonymous'): (401, 0),
+        ('update', 'user'): (200, 9),
+        ('update', 'superuser'): (200, 10),
+        ('partial_update', 'anonymous'): (401, 0),
+        ('partial_update', 'user'): (200, 6),
+        ('partial_update', 'superuser'): (200, 7),
+        ('destroy', 'anonymous'): (401, 0),
+        ('destroy', 'user'): (204, 14),
+        ('destroy', 'superuser'): (204, 13),
+        ('login', 'anonymous'): (400, 1),
+        ('login', 'user'): (200, 8),
+        ('login', 'superuser'): (200, 8),
+    }
+    # Seconds, generous: catches accidental O(n) work, not jitter
+    time_budgets = {'list': 2.0}
+    default_time_budget = 1.0
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='tom', password=self.password
+        )
+        self.admin = User.objects.create_user(
+            username='admin', password=self.password, is_superuser=True
+        )
+        self.other = User.objects.create_user(
+            username='jerry', password=self.password
+        )
+        self.accounts = {'user': self.user, 'superuser': self.admin}
+
+    def get_client(self, kind):
+        client = APIClient()
+        account = self.accounts.get(kind)
+        if account is not None:
+            token = Token.objects.get_or_create(user=account)[0]
+            client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+            # Warm the token cache
+            client.get(reverse('users-detail', args=[account.pk]))
+        return client
+
+    def build_request(self, action, kind):
+        # Users change their own account, the others someone else's
+        target = self.user if kind == 'user' else self.other
+        detail = reverse('users-detail', args=[target.pk])
+        if action == 'list':
+            return 'get', reverse('users-list'), None
+        if action == 'retrieve':
+            return 'get', detail, None
+        if action == 'create':
+            return 'post', reverse('users-list'), {
+                'username': 'spike', 'password': 'A12345a!x',
+                'is_active': True,
+            }
+        if action == 'update':
+            return 'put', detail, {
+                'username': target.username, 'first_name': 'Name',
+                'password': 'A12345a!x', 'is_active': True,
+            }
+        if action == 'partial_update':
+            return 'patch', detail, {'first_name': 'Name'}
+        if action == 'destroy':
+            return 'delete', detail, None
+        account = self.accounts.get(kind, self.user)
+        return 'post', reverse('token-auth'), {
+            'username': account.username,
+            'password': self.password if kind in self.accounts else 'wrong',
+        }
+
+    def assertWithinBudget(self, action, kind, label=None):
+        label = label or f'{action} ({kind})'
+        expected_status, max_queries = self.budgets[(action, kind)]
+        max_seconds = self.time_budgets.get(action, self.default_time_budget)
+        token_cache.clear()
+        counter_store().clear()
+        caches['default'].clear()
+        # Every measurement starts from the same table
+        with transaction.atomic():
+            client = self.get_client(kind)
+            method, url, data = self.build_request(action, kind)
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = getattr(client, method)(url, data)
+                elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        self.assertEqual(response.status_code, expected_status, label)
+        if len(queries) > max_queries:
+            self.fail(
+                f'{label}: {len(queries)} queries, budget {max_queries}. '
+                'Проверьте, не появились ли лишние запросы:\n'
+                + '\n'.join(
+                    f'{number}. {query["sql"]}' for number, query
+                    in enumerate(queries.captured_queries, start=1)
+                )
+            )
+        self.assertLessEqual(
+            elapsed, max_seconds,
+            f'{label}: {elapsed:.3f} s, budget {max_seconds} s'
+        )
+
+    def test_list(self):
+        created = 3
+        for size in self.list_sizes:
+            User.objects.bulk_create(
+                User(username=f'user{i}') for i in range(created, size)
+            )
+            created = size
+            for kind in self.kinds:
+                with self.subTest(size=size, kind=kind):
+                    self.assertWithinBudget(
+                        'list', kind, f'list of {size} ({kind})'
+                    )
+
+    def test_actions(self):
+        actions = sorted({action for action, _ in self.budgets} - {'list'})
+        for action in actions:
+            for kind in self.kinds:
+                with self.subTest(action=action, kind=kind):
+                    self.assertWithinBudget(action, kind)
@@ -0,0 +1,177 @@
+import random
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+
+def sliding_count(previous, current, elapsed, duration):
+    """
+    Sliding window estimate: the previous fixed window counts in
+    proportion to how much of it still overlaps the sliding one
+    """
+    return previous * (1 - elapsed / duration) + current
+
+
+class LocalCounterStore:
+    """
+    Counters of one process, for development and tests
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, duration, limit, now):
+        window, elapsed = divmod(now, duration)
+        with self._lock:
+            previous = self._counters.get((key, window - 1), 0)
+            current = self._counters.get((key, window), 0)
+            if sliding_count(previous, current, elapsed, duration) >= limit:
+                return False, duration - elapsed
+            self._counters[(key, window)] = current + 1
+            if random.random() < 0.01:
+                self._counters = {
+                    item: count for item, count in self._counters.items()
+                    if item[1] >= window - 1
+                }
+        return True, None
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+
+
+class SQLiteCounterStore:
+    """
+    Counters shared by all worker processes of one host through a local
+    SQLite file in WAL mode. Every check is one short write transaction
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = OFF')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS counters ('
+                'key TEXT NOT NULL, window INTEGER NOT NULL, '
+                'count INTEGER NOT NULL, expires REAL NOT NULL, '
+                'PRIMARY KEY (key, window)) WITHOUT ROWID'
+            )
+            self._local.connection = connection
+        return connection
+
+    def hit(self, key, duration, limit, now):
+        window, elapsed = divmod(now, duration)
+        window = int(window)
+        connection = self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            counts = dict(connection.execute(
+                'SELECT window, count FROM counters '
+                'WHERE key = ? AND window >= ?', (key, window - 1)
+            ).fetchall())
+            estimate = sliding_count(
+                counts.get(window - 1, 0), counts.get(window, 0),
+                elapsed, duration
+            )
+            if estimate >= limit:
+                connection.execute('COMMIT')
+                return False, duration - elapsed
+            connection.execute(
+                'INSERT INTO counters VALUES (?, ?, 1, ?) '
+                'ON CONFLICT (key, window) DO UPDATE SET count = count + 1',
+                (key, window, (window + 2) * duration)
+            )
+            if random.random() < 0.001:
+                connection.execute(
+                    'DELETE FROM counters WHERE expires < ?', (now,)
+                )
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return True, None
+
+    def clear(self):
+        self.connection.execute('DELETE FROM counters')
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def counter_store():
+    """
+    Store configured by settings.API_THROTTLE_STORE
+    """
+    options = getattr(settings, 'API_THROTTLE_STORE', {})
+    backend = options.get('BACKEND', 'local')
+    key = (backend, options.get('PATH'))
+    with _stores_lock:
+        if key not in _stores:
+            if backend == 'sqlite':
+                _stores[key] = SQLiteCounterStore(options['PATH'])
+            else:
+                _stores[key] = LocalCounterStore()
+        return _stores[key]
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Sliding window throttle over 'counter_store()', rates are read from
+    REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'][scope] on every request
+    """
+
+    scope = None
+    wait_seconds = None
+
+    def get_cache_key(self, request, view):
+        raise NotImplementedError('.get_cache_key() must be overridden')
+
+    def allow_request(self, request, view):
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        if rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        limit, duration = SimpleRateThrottle.parse_rate(self, rate)
+        allowed, self.wait_seconds = counter_store().hit(
+            f'{self.scope}:{key}', duration, limit, time.time()
+        )
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class LoginRateThrottle(SlidingWindowThrottle):
+    scope = 'login'
+
+    def get_cache_key(self, request, view):
+        return self.get_ident(request)
+
+
+class UserWriteRateThrottle(SlidingWindowThrottle):
+    scope = 'user_write'
+
+    def get_cache_key(self, request, view):
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return None
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return self.get_ident(request)
@@ -1,7 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import LoginToken, UserViewSet
+from .views import LoginToken, Metrics, TokenCacheStats, UserViewSet
 
 
 router = DefaultRouter()
@@ -10,5 +10,8 @@ router.register('users', UserViewSet, basename='users')
 
 urlpatterns = [
     path('api-token-auth/', LoginToken.as_view(), name='token-auth'),
+    path('api/v1/token-cache/', TokenCacheStats.as_view(),
+         name='token-cache-stats'),
+    path('api/v1/metrics/', Metrics.as_view(), name='metrics'),
     path('api/v1/', include(router.urls)),
 ]
@@ -1,31 +1,105 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.contrib.auth.models import update_last_login
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 
 from drf_rw_serializers import viewsets
 
+from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from .permissions import IsAuthorOrAdminOrReadOnly
-from .serializers import ReadOnlyUserSerializer, WriteOnlyUserSerializer
+from . import audit, signed_tokens
+from .authentication import token_cache, token_expired
+from .bulk import BulkUserOperation
+from .conditional import user_etag, users_etag, users_last_modified
+from .export import iter_json, iter_ndjson
+from .filters import UserFilterBackend
+from .metrics import InstrumentedViewMixin, registry
+from .models import AuditEvent, UserChange
+from .pagination import UserCursorPagination
+from .permissions import IsAuthorOrAdminOrReadOnly, IsSuperUser
+from .renderers import (
+    FastJSONParser, FastJSONRenderer, MessagePackParser, MessagePackRenderer,
+)
+from .response_cache import cache_anonymous_response
+from .routers import ReplicaReadMixin
+from .serializers import FastReadOnlyUserSerializer, WriteOnlyUserSerializer
+from .signals import users_changed
+from .throttling import LoginRateThrottle, UserWriteRateThrottle
 
 
 User = get_user_model()
 
 
-class LoginToken(ObtainAuthToken):
+class LoginToken(InstrumentedViewMixin, ObtainAuthToken):
     """
-    update last_login User's field during TokenAuthentication
+    update last_login User's field during TokenAuthentication.
+    Expired tokens are reissued, every login gets a new token
+    with settings.TOKEN_EXPIRY['ROTATE_ON_LOGIN']. Stateless signed
+    tokens are issued instead with settings.STATELESS_TOKENS['ENABLED'].
+    The user resolved by the serializer is reused and last_login is
+    written with one conditional UPDATE, skipped while the stored value
+    is younger than settings.LAST_LOGIN_GRANULARITY seconds
     """
 
+    throttle_classes = [LoginRateThrottle]
+    parser_classes = [FastJSONParser, MessagePackParser, FormParser,
+                      MultiPartParser]
+    renderer_classes = [FastJSONRenderer, MessagePackRenderer]
+
     def post(self, request, *args, **kwargs):
-        result = super().post(request, *args, **kwargs)
-        token = Token.objects.get(key=result.data['token'])
-        update_last_login(None, token.user)
-        return result
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        if signed_tokens.enabled():
+            key = signed_tokens.issue(user)
+        else:
+            key = self.get_token(user).key
+        self.update_last_login(user)
+        audit.record(AuditEvent.LOGIN, request, [user.pk], actor_id=user.pk)
+        return Response({'token': key})
+
+    @staticmethod
+    def get_token(user):
+        token, created = Token.objects.get_or_create(user=user)
+        rotate = getattr(settings, 'TOKEN_EXPIRY', {}).get('ROTATE_ON_LOGIN')
+        if not created and (rotate or token_expired(token)):
+            token.delete()
+            try:
+                with transaction.atomic():
+                    token = Token.objects.create(user=user)
+            except IntegrityError:
+                # A concurrent login of the same user replaced it first
+                token = Token.objects.get(user=user)
+        return token
+
+    @staticmethod
+    def update_last_login(user):
+        now = timezone.now()
+        granularity = getattr(settings, 'LAST_LOGIN_GRANULARITY', 0)
+        stale = Q(last_login__isnull=True) | Q(
+            last_login__lte=now - timedelta(seconds=granularity)
+        )
+        if User.objects.filter(stale, pk=user.pk).update(last_login=now):
+            users_changed.send(sender=User, pks=[user.pk],
+                               fields=['last_login'])
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(InstrumentedViewMixin, ReplicaReadMixin,
+                  viewsets.ModelViewSet):
     """
     Standart ModelMixin classes from 'rest_framework' overriden by
     'drf_rw_serializers'. Method get_serializer() has been split into
@@ -33,6 +107,258 @@ class UserViewSet(viewsets.ModelViewSet):
     """
 
     queryset = User.objects.all()
-    read_serializer_class = ReadOnlyUserSerializer
+    read_serializer_class = FastReadOnlyUserSerializer
     write_serializer_class = WriteOnlyUserSerializer
     permission_classes = [IsAuthorOrAdminOrReadOnly]
+    pagination_class = UserCursorPagination
+    filter_backends = [UserFilterBackend]
+    throttle_classes = [UserWriteRateThrottle]
+    export_chunk_size = 2000
+    bulk_max_items = 1000
+    max_int_param = 2 ** 63 - 1
+    export_formats = {
+        'ndjson': (iter_ndjson, 'application/x-ndjson'),
+        'json': (iter_json, 'application/json'),
+    }
+
+    sparse_actions = ('list', 'retrieve', 'export', 'changes')
+
+    def get_fields(self):
+        """
+        Field subset requested with '?fields=id,username', None for all
+        """
+        if self.action not in self.sparse_actions:
+            return None
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        fields = [name.strip() for name in fields.split(',') if name.strip()]
+        if not fields:
+            raise ValidationError({'fields': ['At least one field name '
+                                              'is required.']})
+        allowed = FastReadOnlyUserSerializer.allowed_fields()
+        unknown = [name for name in fields if name not in allowed]
+        if unknown:
+            raise ValidationError({'fields': [
+                f'Unknown field: {name}.' for name in unknown
+            ]})
+        return fields
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_fields()
+        if fields is not None:
+            queryset = queryset.only(*fields)
+        return queryset
+
+    def get_read_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_fields())
+        return super().get_read_serializer(*args, **kwargs)
+
+    def addresses_request_user(self):
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        user = self.request.user
+        return (lookup is not None and user.is_authenticated
+                and str(lookup) == str(user.pk))
+
+    def get_object(self):
+        """
+        Updates and deletes of the authenticated user's own account
+        reuse request.user instead of loading the same row again,
+        unless it lacks fields of the response (signed token users)
+        """
+        if (self.request.method not in SAFE_METHODS
+                and self.addresses_request_user()
+                and not self.request.user.get_deferred_fields().intersection(
+                    FastReadOnlyUserSerializer.allowed_fields())):
+            self.check_object_permissions(self.request, self.request.user)
+            return self.request.user
+        return super().get_object()
+
+    def perform_update(self, serializer):
+        """
+        Write only the submitted columns with one UPDATE instead of
+        saving every field of the instance
+        """
+        instance = serializer.instance
+        data = serializer.validated_data
+        if not data:
+            return
+        if not User.objects.filter(pk=instance.pk).update(**data):
+            raise NotFound()
+        for name, value in data.items():
+            setattr(instance, name, value)
+        users_changed.send(sender=User, pks=[instance.pk],
+                           fields=list(data))
+        audit.record(AuditEvent.UPDATE, self.request, [instance.pk],
+                     fields=data)
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        audit.record(AuditEvent.CREATE, self.request,
+                     [serializer.instance.pk],
+                     fields=serializer.validated_data)
+
+    def perform_destroy(self, instance):
+        pk = instance.pk
+        super().perform_destroy(instance)
+        audit.record(AuditEvent.DELETE, self.request, [pk])
+
+    @method_decorator(condition(etag_func=users_etag,
+                                last_modified_func=users_last_modified))
+    @cache_anonymous_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @method_decorator(condition(etag_func=user_etag,
+                                last_modified_func=users_last_modified))
+    @cache_anonymous_response(key_func=user_etag)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request, *args, **kwargs):
+        """
+        Stream the whole user list without materializing the queryset
+        or the rendered body. '?output=json' gives a JSON array,
+        NDJSON (one user per line) is the default
+        """
+        output = request.query_params.get('output', 'ndjson')
+        if output not in self.export_formats:
+            output = 'ndjson'
+        encode, content_type = self.export_formats[output]
+        queryset = self.filter_queryset(self.get_queryset()).order_by('id')
+        # Rows are read after dispatch() returns, bind the database now
+        queryset = queryset.using(queryset.db)
+        rows = FastReadOnlyUserSerializer.iter_rows(
+            queryset, self.export_chunk_size, self.get_fields()
+        )
+        return StreamingHttpResponse(encode(rows), content_type=content_type)
+
+    def get_int_param(self, name, default):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            value = -1
+        # Values the database takes, sequence numbers are 64-bit
+        if not 0 <= value <= self.max_int_param:
+            raise ValidationError({
+                name: ['A non-negative integer is required.']
+            })
+        return value
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request, *args, **kwargs):
+        """
+        Users created, modified or deleted after the sequence number
+        '?since=' (0 for all), oldest change first, up to '?limit=' per
+        page. Deleted users are returned as tombstones; pass the returned
+        'cursor' as the next 'since'
+        """
+        options = getattr(settings, 'USERS_PAGINATION', {})
+        since = self.get_int_param('since', 0)
+        limit = max(1, min(
+            self.get_int_param('limit', options.get('PAGE_SIZE', 100)),
+            options.get('MAX_PAGE_SIZE', 1000),
+        ))
+        changes = list(UserChange.objects.filter(seq__gt=since).order_by(
+            'seq').values_list('seq', 'user_id', 'deleted')[:limit + 1])
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        fields = self.get_fields()
+        select = fields if fields is None or 'id' in fields \
+            else ['id'] + fields
+        queryset = self.get_queryset().filter(pk__in=[
+            user_id for _, user_id, deleted in changes if not deleted
+        ])
+        users = {
+            row['id']: row for row in
+            FastReadOnlyUserSerializer.iter_rows(queryset, fields=select)
+        }
+        results = []
+        for seq, user_id, deleted in changes:
+            row = users.get(user_id)
+            if row is None:
+                results.append({'seq': seq, 'id': user_id, 'deleted': True})
+                continue
+            if select is not fields:
+                row = {name: row[name] for name in fields}
+            results.append({'seq': seq, 'id': user_id, 'deleted': False,
+                            'user': row})
+        return Response({
+            'cursor': changes[-1][0] if changes else since,
+            'has_more': has_more,
+            'results': results,
+        })
+
+    @action(detail=False, methods=['post'],
+            permission_classes=[IsSuperUser])
+    def bulk(self, request, *args, **kwargs):
+        """
+        Create, partially update and delete many users in one transaction.
+        Per-item validation errors are returned together, keyed by
+        operation and item index
+        """
+        operation = BulkUserOperation(
+            request.data, self.get_write_serializer_class(),
+            context=self.get_serializer_context(),
+            max_items=self.bulk_max_items,
+        )
+        if not operation.is_valid():
+            return Response(operation.errors,
+                            status=status.HTTP_400_BAD_REQUEST)
+        result = operation.save()
+        audit.record(AuditEvent.CREATE, request,
+                     [user.pk for user in result['created']])
+        audit.record(AuditEvent.UPDATE, request,
+                     [user.pk for user in result['updated']])
+        audit.record(AuditEvent.DELETE, request, result['deleted'])
+        read_serializer_class = self.get_read_serializer_class()
+        return Response({
+            'created': read_serializer_class(
+                result['created'], many=True).data,
+            'updated': read_serializer_class(
+                result['updated'], many=True).data,
+            'deleted': result['deleted'],
+        })
+
+
+class TokenCacheStats(APIView):
+    """
+    hit/miss counters of the authentication token cache
+    """
+
+    permission_classes = [IsSuperUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(token_cache.stats())
+
+
+class Metrics(APIView):
+    """
+    Request histograms and token cache counters
+    in Prometheus text format
+    """
+
+    permission_classes = [IsSuperUser]
+
+    def get(self, request, *args, **kwargs):
+        stats = token_cache.stats()
+        extra = [
+            ('api_token_cache_hits_total', 'counter',
+             'Token cache hits', stats['hits']),
+            ('api_token_cache_misses_total', 'counter',
+             'Token cache misses', stats['misses']),
+            ('api_token_cache_evictions_total', 'counter',
+             'Token cache evictions', stats['evictions']),
+            ('api_token_cache_size', 'gauge',
+             'Tokens held in the local cache', stats['size']),
+        ]
+        return HttpResponse(
+            registry.render(extra),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
@@ -0,0 +1,231 @@
+"""
+ASGI config for test_assignment project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Django 2.2 has no ASGI handler, so the WSGI application is served through
+``WsgiToAsgi``: connections are held by the event loop and only the
+requests being processed occupy one of ``DJANGO_ASGI_THREADS`` worker
+threads, response bodies are streamed chunk by chunk. Request bodies
+above ``DATA_UPLOAD_MAX_MEMORY_SIZE`` are refused with 413.
+
+Run with any ASGI server, e.g. ``uvicorn test_assignment.asgi:application``.
+"""
+
+import asyncio
+import io
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'test_assignment.settings')
+
+
+class WsgiToAsgi:
+    """
+    ASGI application running a WSGI application in a bounded executor.
+    Each request runs on one worker thread from start to close(), so
+    streamed bodies read their database cursor on the thread, and with
+    the connection, that opened it. Chunks reach the event loop through
+    a small queue, a slow client pauses the thread instead of buffering
+    the body. 'max_body_size' defaults to DATA_UPLOAD_MAX_MEMORY_SIZE,
+    None means no limit
+    """
+
+    queue_size = 4
+    TOO_LARGE = object()
+
+    def __init__(self, wsgi_application, max_workers=8,
+                 max_body_size=None):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='asgi'
+        )
+        self._max_body_size = max_body_size
+
+    @property
+    def max_body_size(self):
+        if self._max_body_size is not None:
+            return self._max_body_size
+        return settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"Unsupported scope type {scope['type']}")
+
+        body = await self.read_body(scope, receive)
+        if body is None:
+            return
+        if body is self.TOO_LARGE:
+            await self.send_too_large(send)
+            return
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        cancelled = threading.Event()
+        environ = self.build_environ(scope, body)
+        worker = loop.run_in_executor(
+            self.executor, self.run, environ, loop, queue, cancelled
+        )
+        try:
+            while True:
+                kind, value = await queue.get()
+                if kind == 'error':
+                    raise value
+                if kind == 'end':
+                    break
+                if kind == 'start':
+                    status, headers = value
+                    await send({
+                        'type': 'http.response.start',
+                        'status': status,
+                        'headers': headers,
+                    })
+                else:
+                    await send({'type': 'http.response.body',
+                                'body': value, 'more_body': True})
+        finally:
+            cancelled.set()
+            # Unblock the worker until it has closed the response
+            while not worker.done():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    await asyncio.wait([worker], timeout=0.01)
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def read_body(self, scope, receive):
+        """
+        The request body, None when the client went away and TOO_LARGE
+        above 'max_body_size'
+        """
+        limit = self.max_body_size
+        for name, value in scope.get('headers', []):
+            if (name.lower() == b'content-length' and limit is not None
+                    and value.isdigit() and int(value) > limit):
+                return self.TOO_LARGE
+        body = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if limit is not None and size > limit:
+                return self.TOO_LARGE
+            body.append(chunk)
+            if not message.get('more_body', False):
+                return b''.join(body)
+
+    @staticmethod
+    async def send_too_large(send):
+        await send({
+            'type': 'http.response.start',
+            'status': 413,
+            'headers': [(b'content-type', b'text/plain; charset=utf-8')],
+        })
+        await send({'type': 'http.response.body',
+                    'body': b'Request body too large'})
+
+    def run(self, environ, loop, queue, cancelled):
+        """
+        Worker thread side of one request: call the application, iterate
+        and close the response, handing messages to the event loop
+        """
+        def put(kind, value=None):
+            asyncio.run_coroutine_threadsafe(
+                queue.put((kind, value)), loop
+            ).result()
+
+        try:
+            status, headers, chunks = self.start(environ)
+        except BaseException as exc:
+            put('error', exc)
+            return
+        try:
+            put('start', (status, headers))
+            for chunk in chunks:
+                if cancelled.is_set():
+                    break
+                if chunk:
+                    put('body', chunk)
+        except BaseException as exc:
+            if not cancelled.is_set():
+                put('error', exc)
+            return
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+        put('end')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def start(self, environ):
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin1'), value.encode('latin1'))
+                for name, value in headers
+            ]
+
+        result = self.wsgi_application(environ, start_response)
+        return response['status'], response['headers'], iter(result)
+
+    @staticmethod
+    def build_environ(scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode(
+                'utf8').decode('latin1'),
+            'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin1').upper().replace('-', '_')
+            value = value.decode('latin1')
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = 'HTTP_' + name
+            if name in environ:
+                value = environ[name] + ',' + value
+            environ[name] = value
+        # The body is fully buffered, chunked uploads have no length header
+        environ['CONTENT_LENGTH'] = str(len(body))
+        return environ
+
+
+application = WsgiToAsgi(
+    get_wsgi_application(),
+    max_workers=int(os.environ.get('DJANGO_ASGI_THREADS', 8)),
+)
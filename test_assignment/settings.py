@@ -47,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api_users.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,6 +77,8 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'test_assignment.wsgi.application'
 
+ASGI_APPLICATION = 'test_assignment.asgi.application'
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -87,6 +90,29 @@ DATABASES = {
     }
 }
 
+# Aliases of DATABASES that mirror 'default' and serve safe-method
+# requests of the users API (api_users.routers)
+
+DATABASE_REPLICAS = []
+
+DATABASE_ROUTERS = ['api_users.routers.ReplicaRouter']
+
+
+# Caches
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+# A shared tier without external services can use
+# 'django.core.cache.backends.filebased.FileBasedCache' or
+# 'django.core.cache.backends.db.DatabaseCache'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -99,7 +125,7 @@ AUTH_PASSWORD_VALIDATORS = [
         'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
     },
     {
-        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+        'NAME': 'api_users.passwords.FrozenCommonPasswordValidator',
     },
     {
         'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
@@ -107,6 +133,53 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+AUTHENTICATION_BACKENDS = [
+    'api_users.passwords.PooledModelBackend',
+]
+
+# LoginToken skips the last_login write while the stored value is
+# younger than this many seconds
+
+LAST_LOGIN_GRANULARITY = 60
+
+
+# Password hashing
+# The first hasher is used for new hashes, DJANGO_PASSWORD_HASHER selects it
+# (argon2 and bcrypt need the argon2-cffi and bcrypt packages)
+
+_PASSWORD_HASHERS = {
+    'pbkdf2': 'api_users.hashers.TunablePBKDF2PasswordHasher',
+    'argon2': 'api_users.hashers.TunableArgon2PasswordHasher',
+    'bcrypt': 'api_users.hashers.TunableBCryptSHA256PasswordHasher',
+}
+_PASSWORD_HASHER = os.environ.get('DJANGO_PASSWORD_HASHER', 'pbkdf2')
+
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[_PASSWORD_HASHER]] + [
+    hasher for name, hasher in _PASSWORD_HASHERS.items()
+    if name != _PASSWORD_HASHER
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
+PASSWORD_HASHER_COST = {
+    'PBKDF2_ITERATIONS': int(
+        os.environ.get('DJANGO_PBKDF2_ITERATIONS', 150000)
+    ),
+    'ARGON2_TIME_COST': int(os.environ.get('DJANGO_ARGON2_TIME_COST', 2)),
+    'ARGON2_MEMORY_COST': int(
+        os.environ.get('DJANGO_ARGON2_MEMORY_COST', 512)
+    ),
+    'ARGON2_PARALLELISM': int(os.environ.get('DJANGO_ARGON2_PARALLELISM', 2)),
+    'BCRYPT_ROUNDS': int(os.environ.get('DJANGO_BCRYPT_ROUNDS', 12)),
+}
+
+# Bounded pool that runs password hashing (api_users.passwords)
+
+PASSWORD_HASHER_POOL = {
+    'WORKERS': int(os.environ.get('DJANGO_HASHER_WORKERS', 4)),
+    'MAX_PENDING': int(os.environ.get('DJANGO_HASHER_MAX_PENDING', 16)),
+    'TIMEOUT': 10,
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/2.2/topics/i18n/
 
@@ -131,7 +204,115 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api_users.signed_tokens.SignedTokenAuthentication',
+        'api_users.authentication.ExpiringTokenAuthentication',
+    ],
+    # orjson-backed JSON, the stdlib json module when it is not installed.
+    # MessagePack formats are only negotiated with msgpack installed
+    'DEFAULT_RENDERER_CLASSES': [
+        'api_users.renderers.FastJSONRenderer',
+        'api_users.renderers.MessagePackRenderer',
+        'api_users.renderers.ColumnarMessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api_users.renderers.FastJSONParser',
+        'api_users.renderers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_CONTENT_NEGOTIATION_CLASS':
+        'api_users.renderers.ContentNegotiation',
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
+    'DEFAULT_THROTTLE_RATES': {
+        'login': '20/min',
+        'user_write': '120/min',
+    },
+    # Clients are told apart by REMOTE_ADDR; with None DRF would trust
+    # any X-Forwarded-For the client sends and throttling is bypassed
+    'NUM_PROXIES': 0,
+}
+
+# Cache of resolved authentication tokens (api_users.authentication).
+# BACKEND is an optional CACHES alias used as a shared second tier.
+# Without it user changes (deactivation, new password) invalidate only
+# the process that made them, other workers notice within TTL seconds;
+# with it every cache hit checks a per-user version in BACKEND.
+
+TOKEN_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 300,
+    'BACKEND': None,
+}
+
+# Token lifetime (api_users.authentication.ExpiringTokenAuthentication).
+# MAX_AGE and IDLE_TIMEOUT are seconds, None disables the limit;
+# IDLE_TIMEOUT is applied by 'manage.py purge_tokens' only.
+
+TOKEN_EXPIRY = {
+    'MAX_AGE': 30 * 24 * 60 * 60,
+    'IDLE_TIMEOUT': 7 * 24 * 60 * 60,
+    'ROTATE_ON_LOGIN': False,
+    'USAGE_FLUSH_INTERVAL': 60,
+    'USAGE_MAX_KEYS': 10000,
+}
+
+# Stateless HMAC-signed tokens (api_users.signed_tokens): LoginToken
+# issues them instead of authtoken keys when ENABLED. Revocations reach
+# other processes within REFRESH_INTERVAL seconds.
+
+STATELESS_TOKENS = {
+    'ENABLED': os.environ.get('DJANGO_STATELESS_TOKENS', '') == '1',
+    'REFRESH_INTERVAL': 5,
+}
+
+# Audit events of user changes and logins (api_users.audit), queued in
+# memory and written in batches of BATCH_SIZE at least every INTERVAL
+# seconds by a background thread. BACKEND is 'database' (AuditEvent) or
+# 'ndjson' (file at PATH, rotated at MAX_BYTES). At MAX_SIZE queued
+# events POLICY 'drop' discards new ones, 'block' first waits up to
+# BLOCK_TIMEOUT seconds.
+
+AUDIT_LOG = {
+    'ENABLED': True,
+    'BACKEND': 'database',
+    'PATH': os.path.join(BASE_DIR, 'audit.ndjson'),
+    'MAX_BYTES': 10 * 1024 * 1024,
+    'BACKUP_COUNT': 5,
+    'BATCH_SIZE': 100,
+    'INTERVAL': 1.0,
+    'MAX_SIZE': 10000,
+    'POLICY': 'drop',
+    'BLOCK_TIMEOUT': 0.05,
+    'WORKER': True,
+}
+
+# Keyset pagination of the users list (api_users.pagination)
+
+USERS_PAGINATION = {
+    'PAGE_SIZE': 100,
+    'MAX_PAGE_SIZE': 1000,
+    'REQUIRED': False,
+}
+
+# Cache of anonymous users API responses (api_users.response_cache).
+# BACKEND is a CACHES alias, None disables the cache.
+
+USERS_RESPONSE_CACHE = {
+    'BACKEND': 'default',
+    'TIMEOUT': 300,
+}
+
+# Per-request instrumentation (api_users.metrics), share of requests sampled
+
+API_METRICS = {
+    'SAMPLE_RATE': float(os.environ.get('DJANGO_METRICS_SAMPLE_RATE', 0.1)),
+}
+
+# Counters of the login and write throttles (api_users.throttling).
+# 'local' keeps them per process, 'sqlite' shares them between the
+# processes of one host through the file at PATH.
+
+API_THROTTLE_STORE = {
+    'BACKEND': 'local',
 }
@@ -0,0 +1,55 @@
+"""
+API-only production profile: the token-authenticated JSON API without
+admin, sessions, messages, static files and templates.
+
+Use with DJANGO_SETTINGS_MODULE=test_assignment.settings_api, it reads
+the same environment as test_assignment.settings_production.
+"""
+
+from .settings_production import *  # noqa: F401,F403
+from .settings_production import REST_FRAMEWORK
+
+
+# UserViewSet and LoginToken only need auth (contenttypes is its
+# dependency) and authtoken. Without admin the root URLconf does not
+# import django.contrib.admin at all
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'rest_framework',
+    'rest_framework.authtoken',
+    'api_users',
+]
+
+# DRF authenticates requests itself and its views are CSRF exempt, so
+# sessions, CSRF, the auth middleware, messages and clickjacking headers
+# only add work to every request
+
+MIDDLEWARE = [
+    'api_users.metrics.MetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+TEMPLATES = []
+
+# Responses and error messages are English only, no catalogs to load
+
+USE_I18N = False
+
+# JSON and MessagePack only: the browsable API would pull in templates
+# and forms
+
+REST_FRAMEWORK = dict(
+    REST_FRAMEWORK,
+    DEFAULT_RENDERER_CLASSES=[
+        'api_users.renderers.FastJSONRenderer',
+        'api_users.renderers.MessagePackRenderer',
+        'api_users.renderers.ColumnarMessagePackRenderer',
+    ],
+    DEFAULT_PARSER_CLASSES=[
+        'api_users.renderers.FastJSONParser',
+        'api_users.renderers.MessagePackParser',
+    ],
+)
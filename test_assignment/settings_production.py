@@ -0,0 +1,119 @@
+"""
+Production settings for test_assignment project, configured from
+the environment.
+
+Use with DJANGO_SETTINGS_MODULE=test_assignment.settings_production.
+"""
+
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import (
+    AUDIT_LOG, BASE_DIR, CACHES, REST_FRAMEWORK, TOKEN_CACHE,
+)
+
+
+def env_list(name, default=''):
+    return [item for item in os.environ.get(name, default).split(',') if item]
+
+
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+
+DEBUG = os.environ.get('DJANGO_DEBUG', '') == '1'
+
+ALLOWED_HOSTS = env_list('DJANGO_ALLOWED_HOSTS', 'localhost')
+
+
+# Database
+# Connections are kept for DJANGO_DB_CONN_MAX_AGE seconds and checked
+# before every request (DB_HEALTH_CHECKS, api_users.db)
+
+DB_ENGINE = os.environ.get('DJANGO_DB_ENGINE', 'django.db.backends.sqlite3')
+
+
+def database(name):
+    settings = {
+        'ENGINE': DB_ENGINE,
+        'NAME': name,
+        'CONN_MAX_AGE': int(os.environ.get('DJANGO_DB_CONN_MAX_AGE', 600)),
+        'OPTIONS': {},
+    }
+    if DB_ENGINE == 'django.db.backends.sqlite3':
+        # Seconds a writer waits for the database lock
+        settings['OPTIONS']['timeout'] = float(
+            os.environ.get('DJANGO_SQLITE_BUSY_TIMEOUT', 5)
+        )
+    else:
+        settings.update({
+            'USER': os.environ.get('DJANGO_DB_USER', ''),
+            'PASSWORD': os.environ.get('DJANGO_DB_PASSWORD', ''),
+            'HOST': os.environ.get('DJANGO_DB_HOST', ''),
+            'PORT': os.environ.get('DJANGO_DB_PORT', ''),
+        })
+    return settings
+
+
+DATABASES = {
+    'default': database(
+        os.environ.get('DJANGO_DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3'))
+    ),
+}
+
+# DJANGO_DB_REPLICAS is a comma separated list of replica database names
+DATABASE_REPLICAS = []
+for index, name in enumerate(env_list('DJANGO_DB_REPLICAS')):
+    alias = f'replica{index}'
+    DATABASES[alias] = database(name)
+    DATABASE_REPLICAS.append(alias)
+
+DB_HEALTH_CHECKS = True
+
+# Single node SQLite: WAL lets readers run alongside the writer
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
+    'mmap_size': 268435456,
+}
+
+
+# Cache shared by the worker processes of the host. The token cache uses
+# it as its second tier, so deactivating or demoting a user takes effect
+# in every worker at once
+CACHES = dict(CACHES, shared={
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.environ.get(
+        'DJANGO_SHARED_CACHE_DIR', os.path.join(BASE_DIR, 'cache')
+    ),
+    'OPTIONS': {
+        'MAX_ENTRIES': 100000,
+    },
+})
+
+TOKEN_CACHE = dict(TOKEN_CACHE, BACKEND='shared')
+
+# Number of reverse proxies in front of the workers, the client address
+# is read from X-Forwarded-For as the last of them appended it
+REST_FRAMEWORK = dict(
+    REST_FRAMEWORK,
+    NUM_PROXIES=int(os.environ.get('DJANGO_NUM_PROXIES', 0)),
+)
+
+# Throttle counters shared by the worker processes of the host
+API_THROTTLE_STORE = {
+    'BACKEND': 'sqlite',
+    'PATH': os.environ.get(
+        'DJANGO_THROTTLE_DB', os.path.join(BASE_DIR, 'throttle.sqlite3')
+    ),
+}
+
+
+# Audit events go to the database unless DJANGO_AUDIT_BACKEND=ndjson
+AUDIT_LOG = dict(
+    AUDIT_LOG,
+    BACKEND=os.environ.get('DJANGO_AUDIT_BACKEND', 'database'),
+    PATH=os.environ.get(
+        'DJANGO_AUDIT_LOG', os.path.join(BASE_DIR, 'audit.ndjson')
+    ),
+)
@@ -13,11 +13,16 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.apps import apps
 from django.urls import include, path
 
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('', include('api_users.urls')),
 ]
+
+# Importing the admin is costly, API-only deployments do not install it
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path('admin/', admin.site.urls))